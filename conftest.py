@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    """Загруженные в тестах картинки и их миниатюры пишутся во временный
+    каталог, а не в yatube/media."""
+    settings.MEDIA_ROOT = str(tmpdir.mkdir("media"))
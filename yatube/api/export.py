@@ -0,0 +1,38 @@
+"""Выгрузка таблиц для хранилища данных по HTTP (см. posts.exports)."""
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
+
+from posts.exports import EXPORTS, FORMATS, export_chunks, parse_since
+
+from .serializers import InvalidParameter
+from .views import api_view
+
+
+@api_view
+def export(request, table):
+    """Потоковая выгрузка таблицы, только для персонала: ?format=csv|jsonl
+    и ?since= для инкрементальной выгрузки."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    if table not in EXPORTS:
+        raise Http404
+    output_format = request.GET.get("format", "jsonl")
+    if output_format not in FORMATS:
+        raise InvalidParameter(
+            "format должен быть одним из: " + ", ".join(FORMATS)
+        )
+    since = request.GET.get("since")
+    if since:
+        try:
+            since = parse_since(since)
+        except ValueError as exc:
+            raise InvalidParameter(str(exc))
+    chunks = export_chunks(table, output_format, since or None)
+    _, content_type = FORMATS[output_format]
+    response = StreamingHttpResponse(
+        (chunk.encode() for chunk in chunks), content_type=content_type
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{table}.{output_format}"'
+    )
+    return response
@@ -0,0 +1,135 @@
+"""Поля ответов API и потоковая сериализация.
+
+Клиент выбирает поля параметром ``?fields=id,text,author``. Каждое поле
+знает, какие колонки ему нужны и какие связанные объекты подтянуть
+select_related, поэтому из базы читается только то, что попадёт в ответ,
+и одним запросом.
+"""
+from collections import namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# columns - аргументы only(), related - аргументы select_related(),
+# value - значение поля для объекта.
+Field = namedtuple("Field", "columns related value")
+
+
+class InvalidParameter(Exception):
+    """Неверный параметр запроса: API отвечает 400 с его описанием."""
+
+
+POST_FIELDS = {
+    "id": Field(("id",), (), lambda post: post.pk),
+    "text": Field(("text",), (), lambda post: post.text),
+    "pub_date": Field(("pub_date",), (), lambda post: post.pub_date),
+    "updated": Field(("updated",), (), lambda post: post.updated),
+    "author": Field(
+        ("author__username",), ("author",),
+        lambda post: post.author.username,
+    ),
+    "group": Field(
+        ("group__slug",), ("group",),
+        lambda post: post.group.slug if post.group else None,
+    ),
+    "image": Field(
+        ("image",), (), lambda post: post.image.url if post.image else None
+    ),
+    "comment_count": Field(
+        ("comment_count",), (), lambda post: post.comment_count
+    ),
+}
+
+# Колонки, по которым видно, что объект изменился: из них и даты
+# последних переименований групп и авторов считается ETag до того, как
+# объекты загружены и сериализованы.
+POST_VERSION = ("id", "updated", "comment_count")
+
+COMMENT_FIELDS = {
+    "id": Field(("id",), (), lambda comment: comment.pk),
+    "post": Field(("post_id",), (), lambda comment: comment.post_id),
+    "author": Field(
+        ("author__username",), ("author",),
+        lambda comment: comment.author.username,
+    ),
+    "text": Field(("text",), (), lambda comment: comment.text),
+    "created": Field(("created",), (), lambda comment: comment.created),
+}
+
+# Комментарии не редактируются.
+COMMENT_VERSION = ("id", "created")
+
+
+def group_data(group):
+    return {
+        "slug": group.slug,
+        "title": group.title,
+        "description": group.description,
+        "post_count": group.post_count,
+    }
+
+
+def author_data(author):
+    stats = getattr(author, "post_stats", None)
+    return {
+        "username": author.username,
+        "full_name": author.get_full_name(),
+        "post_count": stats.post_count if stats else 0,
+    }
+
+
+def parse_fields(value, spec):
+    """Имена полей из параметра ``fields``; без него - все поля.
+    Неизвестное поле - InvalidParameter."""
+    if not value:
+        return tuple(spec)
+    names = tuple(dict.fromkeys(
+        name.strip() for name in value.split(",") if name.strip()
+    ))
+    unknown = [name for name in names if name not in spec]
+    if unknown or not names:
+        raise InvalidParameter(
+            "Неизвестные поля: " + ", ".join(unknown) if unknown
+            else "Не выбрано ни одного поля"
+        )
+    return names
+
+
+def select_fields(queryset, names, spec, required=()):
+    """Ограничивает запрос колонками выбранных полей. `required` -
+    колонки, нужные не ответу, а, например, ключу курсора."""
+    columns = list(required)
+    related = []
+    for name in names:
+        columns.extend(spec[name].columns)
+        related.extend(spec[name].related)
+    if related:
+        queryset = queryset.select_related(*dict.fromkeys(related))
+    return queryset.only(*dict.fromkeys(columns))
+
+
+def serialize(obj, names, spec):
+    return {name: spec[name].value(obj) for name in names}
+
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _chunks(data, results):
+    if results is None:
+        yield _encoder.encode(data)
+        return
+    head = _encoder.encode(data)[:-1]
+    yield head + ("," if data else "") + '"results":['
+    for index, row in enumerate(results):
+        yield ("," if index else "") + _encoder.encode(row)
+    yield "]}"
+
+
+def json_response(data, results=None):
+    """Компактный JSON-ответ, который отдаётся частями: по строке на
+    объект из `results`."""
+    return StreamingHttpResponse(
+        (chunk.encode() for chunk in _chunks(data, results)),
+        content_type="application/json",
+    )
@@ -0,0 +1,225 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            "auth", first_name="Имя", last_name="Фамилия"
+        )
+        cls.reader = User.objects.create_user("reader")
+        cls.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f"пост {number}",
+            )
+            for number in range(15)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(12):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.reader if number % 2 else cls.author,
+                text=f"комментарий {number}",
+            )
+
+    def get(self, name, query=None, **kwargs):
+        response = self.client.get(
+            reverse(f"api:{name}", kwargs=kwargs), query or {}
+        )
+        if response.streaming:
+            response.data = json.loads(b"".join(response.streaming_content))
+        else:
+            response.data = json.loads(response.content or b"null")
+        return response
+
+    def test_feed_pages_with_cursors(self):
+        first = self.get("index")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "application/json")
+        self.assertEqual(
+            [post["id"] for post in first.data["results"]],
+            [post.pk for post in self.posts[::-1][:10]],
+        )
+        self.assertIsNone(first.data["previous"])
+
+        second = self.get("index", {"after": first.data["next"]})
+        self.assertEqual(
+            [post["id"] for post in second.data["results"]],
+            [post.pk for post in self.posts[::-1][10:]],
+        )
+        self.assertIsNone(second.data["next"])
+        back = self.get("index", {"before": second.data["previous"]})
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_post_fields(self):
+        response = self.get("post_detail", post_id=self.post.pk)
+        self.assertEqual(response.data["author"], "auth")
+        self.assertEqual(response.data["group"], None)
+        self.assertEqual(response.data["comment_count"], 12)
+        self.assertEqual(
+            set(response.data),
+            {
+                "id", "text", "pub_date", "updated", "author", "group",
+                "image", "comment_count",
+            },
+        )
+
+    def test_fields_trim_payload(self):
+        response = self.get("index", {"fields": "id,author", "limit": 2})
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"id": self.posts[-1].pk, "author": "auth"},
+                {"id": self.posts[-2].pk, "author": "auth"},
+            ],
+        )
+        response = self.get(
+            "post_detail", {"fields": "text"}, post_id=self.post.pk
+        )
+        self.assertEqual(response.data, {"text": "пост 14"})
+
+    def test_group_and_profile(self):
+        response = self.get("group_list", slug="slug")
+        self.assertEqual(response.data["group"]["post_count"], 7)
+        self.assertEqual(len(response.data["results"]), 7)
+        self.assertTrue(
+            all(post["group"] == "slug" for post in response.data["results"])
+        )
+
+        response = self.get("profile", username="auth")
+        self.assertEqual(
+            response.data["author"],
+            {"username": "auth", "full_name": "Имя Фамилия",
+             "post_count": 15},
+        )
+
+    def test_comments_oldest_first(self):
+        response = self.get(
+            "post_comments", {"limit": 5, "fields": "text"},
+            post_id=self.post.pk,
+        )
+        self.assertEqual(
+            [comment["text"] for comment in response.data["results"]],
+            [f"комментарий {number}" for number in range(5)],
+        )
+        response = self.get(
+            "post_comments", {"after": response.data["next"], "limit": 5},
+            post_id=self.post.pk,
+        )
+        self.assertEqual(
+            response.data["results"][0]["text"], "комментарий 5"
+        )
+
+    def test_no_repeated_queries(self):
+        # Первый запрос каждой страницы - валидатор (см. conditional_json).
+        cases = [
+            ("index", {}, {}, 2),
+            ("group_list", {}, {"slug": "slug"}, 3),
+            ("profile", {}, {"username": "auth"}, 3),
+            ("post_detail", {}, {"post_id": self.post.pk}, 2),
+            ("post_comments", {"limit": 12}, {"post_id": self.post.pk}, 3),
+        ]
+        for name, query, kwargs, queries in cases:
+            with self.subTest(view=name):
+                with self.assertNumQueries(queries):
+                    self.assertEqual(
+                        self.get(name, query, **kwargs).status_code, 200
+                    )
+
+    def test_conditional_get(self):
+        url = reverse("api:post_detail", kwargs={"post_id": self.post.pk})
+        response = self.client.get(url)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+
+        Comment.objects.create(post=self.post, author=self.author, text="к")
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 200)
+
+    def test_not_modified_without_loading_objects(self):
+        url = reverse("api:index")
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.group.title = "новое название"
+        self.group.save()
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 200)
+
+    def test_only_parameter_errors_are_bad_requests(self):
+        with mock.patch("api.views.serialize", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.client.get(reverse("api:index"))
+
+    def test_errors_are_json(self):
+        cases = [
+            ("index", {"fields": "id,secret"}, {}, 400),
+            ("index", {"limit": 1000}, {}, 400),
+            ("index", {"limit": "много"}, {}, 400),
+            ("group_list", {}, {"slug": "missing"}, 404),
+            ("post_comments", {}, {"post_id": 999}, 404),
+        ]
+        for name, query, kwargs, status in cases:
+            with self.subTest(view=name, query=query):
+                response = self.get(name, query, **kwargs)
+                self.assertEqual(response.status_code, status)
+                self.assertIn("error", response.data)
+
+    def test_read_only(self):
+        response = self.client.post(reverse("api:index"))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response["Allow"], "GET, HEAD")
+        self.assertIn("error", json.loads(response.content))
+
+    def test_export_is_staff_only(self):
+        url = reverse("api:export", kwargs={"table": "posts"})
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_export_streams_table(self):
+        staff = User.objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+        url = reverse("api:export", kwargs={"table": "posts"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn(
+            'filename="posts.jsonl"', response["Content-Disposition"]
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines],
+            [post.pk for post in self.posts],
+        )
+
+        response = self.client.get(
+            url, {"format": "csv", "since": "2999-01-01"}
+        )
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        # Только заголовок: постов новее нет.
+        content = b"".join(response.streaming_content)
+        self.assertEqual(len(content.splitlines()), 1)
+
+        for query in ({"format": "xml"}, {"since": "вчера"}):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url, query).status_code, 400)
+        missing = reverse("api:export", kwargs={"table": "sessions"})
+        self.assertEqual(self.client.get(missing).status_code, 404)
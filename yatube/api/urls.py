@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import export, views
+
+app_name = "api"
+
+# Маршруты повторяют posts.urls: те же страницы, но в JSON.
+urlpatterns = [
+    path("", views.feed, name="index"),
+    path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path("profile/<str:username>/", views.profile, name="profile"),
+    path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/", views.post_comments,
+        name="post_comments",
+    ),
+    path("export/<slug:table>/", export.export, name="export"),
+]
@@ -0,0 +1,191 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from posts.conditional import authors_changed, groups_changed
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPaginator
+
+from .serializers import (
+    COMMENT_FIELDS, COMMENT_VERSION, POST_FIELDS, POST_VERSION,
+    InvalidParameter, author_data, group_data, json_response, parse_fields,
+    select_fields, serialize,
+)
+
+POST_ORDERING = ("-pub_date", "-id")
+COMMENT_ORDERING = ("created", "id")
+
+
+def api_view(view):
+    """Только GET/HEAD; ошибки отдаются в JSON, а не HTML-страницей."""
+    def error(message, status):
+        return JsonResponse(
+            {"error": message}, status=status,
+            json_dumps_params={"ensure_ascii": False},
+        )
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            response = error("Метод не поддерживается", 405)
+            response["Allow"] = "GET, HEAD"
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidParameter as exc:
+            return error(str(exc), 400)
+        except PermissionDenied:
+            return error("Доступ запрещён", 403)
+        except Http404:
+            return error("Не найдено", 404)
+    return wrapper
+
+
+def page_size(request):
+    value = request.GET.get("limit")
+    if not value:
+        return settings.API_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if not 1 <= size <= settings.API_MAX_PAGE_SIZE:
+        raise InvalidParameter(
+            f"limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}"
+        )
+    return size
+
+
+def versions(queryset, columns):
+    """Только колонки версии объектов (POST_VERSION) и даты последних
+    переименований групп и авторов, которые выводятся в ответе."""
+    return queryset.only(*columns).annotate(
+        groups_changed=groups_changed(), authors_changed=authors_changed()
+    )
+
+
+def version_state(objects, columns):
+    return [
+        tuple(getattr(obj, name) for name in columns)
+        + (obj.groups_changed, obj.authors_changed)
+        for obj in objects
+    ]
+
+
+def snapshot(queryset):
+    """Одна транзакция чтения для ETag и тела ответа: запись между их
+    запросами дала бы тело новее или старше своего ETag. В SQLite (WAL)
+    все SELECT транзакции видят один снимок базы. savepoint=False -
+    внутри чужой транзакции (тесты) без лишних SAVEPOINT."""
+    return transaction.atomic(using=queryset.db, savepoint=False)
+
+
+def conditional_json(request, state, build):
+    """Ответ 304, если ETag по состоянию `state` совпал с If-None-Match:
+    состояние считается дёшево, до загрузки и сериализации объектов.
+    Иначе - ответ `build()` с этим ETag. Вызывается внутри snapshot()
+    вместе с запросом состояния."""
+    etag = quote_etag(hashlib.md5(repr(state).encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response["ETag"] = etag
+    return response
+
+
+def page_response(request, queryset, spec, version, ordering, data=None):
+    """Страница объектов `queryset` с выбранными полями и курсорами
+    next/previous для параметров ?after=/?before=."""
+    names = parse_fields(request.GET.get("fields"), spec)
+    size = page_size(request)
+    cursors = {
+        "after": request.GET.get("after"),
+        "before": request.GET.get("before"),
+    }
+    keys = [name.lstrip("-") for name in ordering]
+
+    def build():
+        page = CursorPaginator(
+            select_fields(queryset, names, spec, required=keys),
+            size, ordering,
+        ).get_page(**cursors)
+        return json_response(
+            dict(
+                data or {}, next=page.next_cursor,
+                previous=page.previous_cursor,
+            ),
+            [serialize(obj, names, spec) for obj in page],
+        )
+
+    with snapshot(queryset):
+        current = CursorPaginator(
+            versions(queryset, [*keys, *version]), size, ordering
+        ).get_page(**cursors)
+        state = (
+            names, data, current.next_cursor, current.previous_cursor,
+            version_state(current, version),
+        )
+        return conditional_json(request, state, build)
+
+
+@api_view
+def feed(request):
+    return page_response(
+        request, Post.objects.all(), POST_FIELDS, POST_VERSION, POST_ORDERING
+    )
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(
+        request, Post.objects.filter(group=group), POST_FIELDS, POST_VERSION,
+        POST_ORDERING, {"group": group_data(group)},
+    )
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related("post_stats"), username=username
+    )
+    return page_response(
+        request, Post.objects.filter(author=author), POST_FIELDS, POST_VERSION,
+        POST_ORDERING, {"author": author_data(author)},
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    names = parse_fields(request.GET.get("fields"), POST_FIELDS)
+
+    def build():
+        post = get_object_or_404(
+            select_fields(Post.objects.all(), names, POST_FIELDS), pk=post_id
+        )
+        return json_response(serialize(post, names, POST_FIELDS))
+
+    with snapshot(Post.objects.all()):
+        current = get_object_or_404(
+            versions(Post.objects.all(), POST_VERSION), pk=post_id
+        )
+        return conditional_json(
+            request, (names, version_state([current], POST_VERSION)), build
+        )
+
+
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return page_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        COMMENT_VERSION, COMMENT_ORDERING,
+    )
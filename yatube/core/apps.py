@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from .db import configure_sqlite
+        from .replicas import end_request
+        from .template_loaders import precompile_templates
+
+        connection_created.connect(
+            configure_sqlite, dispatch_uid="core.configure_sqlite"
+        )
+        request_finished.connect(
+            end_request, dispatch_uid="core.replicas_end_request"
+        )
+        if settings.TEMPLATES_PRECOMPILE:
+            precompile_templates()
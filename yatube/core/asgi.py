@@ -0,0 +1,143 @@
+"""ASGI-обёртка для WSGI-приложения Django 2.2.
+
+Django до 3.0 не умеет ASGI, а asgiref.wsgi.WsgiToAsgi выполняет все
+запросы в одном общем потоке (sync_to_async с thread_sensitive=True):
+под ASGI-сервером сайт обслуживал бы запросы строго по одному.
+ThreadedWsgiToAsgi запускает каждый запрос в потоке своего пула, поэтому
+пока один запрос ждёт базу, другие выполняются. Соединения с базой у
+Django и так свои у каждого потока.
+
+Асинхронных представлений и параллельных запросов к базе внутри одного
+представления здесь нет: они появились только в Django 3.1, а проект
+остаётся на Django 2.2. Каждый запрос по-прежнему синхронный.
+
+Обёртка написана на публичном API asgiref (sync_to_async с executor,
+async_to_sync) и не зависит от устройства WsgiToAsgi. Ответ WSGI
+закрывается в том же потоке: иначе Django не получил бы request_finished
+- не закрыл бы соединения с базой и не отправил метрики запроса.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+# Тело запроса больше этого размера пишется во временный файл.
+MAX_BODY_IN_MEMORY = 64 * 1024
+
+
+def build_environ(scope, body):
+    """WSGI environ по HTTP scope ASGI и файлу с телом запроса."""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": BytesIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = f"HTTP_{name}"
+        value = value.decode("latin1")
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    return environ
+
+
+def run_wsgi(application, environ, send):
+    """Выполняет WSGI-приложение и отправляет ответ сообщениями ASGI
+    через синхронный `send`. Вызывается в потоке пула."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and started.get("sent"):
+            raise exc_info[1].with_traceback(exc_info[2])
+        started["message"] = {
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [
+                (name.lower().encode("ascii"), value.encode("latin1"))
+                for name, value in headers
+            ],
+        }
+
+    def send_start():
+        if not started.get("sent"):
+            started["sent"] = True
+            send(started["message"])
+
+    result = application(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                send_start()
+                send({
+                    "type": "http.response.body", "body": chunk,
+                    "more_body": True,
+                })
+        send_start()
+        send({"type": "http.response.body"})
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+class ThreadedWsgiToAsgi:
+    """ASGI-приложение из WSGI-приложения: каждый HTTP-запрос в потоке
+    пула из `max_workers` потоков (по умолчанию как у
+    ThreadPoolExecutor)."""
+
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="wsgi"
+        )
+        self.run = sync_to_async(
+            run_wsgi, thread_sensitive=False, executor=self.executor
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Неподдерживаемый scope: {scope['type']}")
+        with SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            await self.run(
+                self.wsgi_application, build_environ(scope, body),
+                async_to_sync(send),
+            )
+
+    async def lifespan(self, receive, send):
+        # Django 2.2 нечего запускать при старте; при остановке
+        # завершаем пул потоков.
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,162 @@
+"""Нагрузочный тест одного процесса для benchmark_asgi: пропускная
+способность страниц сайта под многопоточным WSGI-сервером и под ASGI
+(core.asgi и asgiref.wsgi.WsgiToAsgi как есть).
+
+Страницы и заполненная база - из posts.benchmarks.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+
+from posts.benchmarks import view_requests
+
+from .asgi import ThreadedWsgiToAsgi
+
+
+def _delayed(seconds):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+def _with_latency(application, seconds):
+    """WSGI-приложение, у которого каждый запрос к базе ждёт `seconds`:
+    так SQLite в памяти ведёт себя как сервер базы по сети."""
+    if not seconds:
+        return application
+
+    def delayed(environ, start_response):
+        with connection.execute_wrapper(_delayed(seconds)):
+            return application(environ, start_response)
+    return delayed
+
+
+def _wsgi_environ(url):
+    path, _, query = url.partition("?")
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "testserver",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "wsgi.version": (1, 0),
+    }
+
+
+def _serve_wsgi(application, urls, concurrency):
+    """Прогоняет запросы через WSGI-приложение в пуле из `concurrency`
+    потоков - как многопоточный WSGI-сервер. Возвращает статусы."""
+    def request(url):
+        statuses = []
+        result = application(
+            _wsgi_environ(url),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        try:
+            b"".join(result)
+        finally:
+            result.close()
+        return int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(request, urls))
+
+
+def _asgi_scope(url):
+    path, _, query = url.partition("?")
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 40000),
+        "server": ("testserver", 80),
+    }
+
+
+def _serve_asgi(application, urls, concurrency):
+    """Прогоняет запросы через ASGI-приложение, не больше `concurrency`
+    одновременно - как ASGI-сервер с одним циклом событий."""
+    async def request(url, limit):
+        messages = [{"type": "http.request", "body": b""}]
+        statuses = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        async with limit:
+            await application(_asgi_scope(url), receive, send)
+        return statuses[0]
+
+    async def serve():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(concurrency)
+        )
+        limit = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(request(url, limit) for url in urls))
+
+    return asyncio.run(serve())
+
+
+SERVERS = {
+    # Многопоточный WSGI-сервер, как gunicorn --threads.
+    "wsgi": (_serve_wsgi, lambda application: application),
+    # core.asgi: поток пула на запрос.
+    "asgi": (_serve_asgi, ThreadedWsgiToAsgi),
+    # asgiref.wsgi.WsgiToAsgi как есть: все запросы в одном потоке.
+    "asgi_single_thread": (_serve_asgi, WsgiToAsgi),
+}
+
+
+def run_server_benchmarks(requests=200, concurrency=8, latency_ms=0):
+    """Пропускная способность одного процесса на GET-страницах
+    view_requests под каждым сервером SERVERS: {сервер: {метрика:
+    значение}}.
+
+    Запросы идут анонимно и по кругу по страницам; `latency_ms`
+    добавляется к каждому запросу к базе."""
+    _, pages = view_requests()
+    urls = [url for _, method, url, *_ in pages if method == "get"]
+    urls = [urls[number % len(urls)] for number in range(requests)]
+    application = _with_latency(WSGIHandler(), latency_ms / 1000)
+    results = {}
+    for name, (serve, adapt) in SERVERS.items():
+        served = adapt(application)
+        serve(served, urls[:concurrency], concurrency)
+        started = time.perf_counter()
+        statuses = serve(served, urls, concurrency)
+        elapsed = time.perf_counter() - started
+        failed = [status for status in statuses if status != 200]
+        if failed:
+            raise AssertionError(f"{name}: ответы {sorted(set(failed))}")
+        results[name] = {
+            "requests_per_s": round(requests / elapsed, 1),
+            "ms_per_request": round(elapsed * 1000 / requests, 2),
+        }
+    return results
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик `connection_created`: настраивает каждое новое
+    соединение с SQLite прагмами из `SQLITE_PRAGMAS`.
+
+    WAL позволяет читателям не ждать писателя, а busy_timeout - ждать
+    блокировку вместо немедленной ошибки "database is locked".
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
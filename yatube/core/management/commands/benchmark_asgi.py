@@ -0,0 +1,64 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import run_server_benchmarks
+from posts.benchmarks import DATASETS, seeded_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест одного процесса: сколько запросов в секунду к "
+        "страницам index, group_posts, profile и post_detail выдерживает "
+        "сайт под многопоточным WSGI-сервером и под ASGI (core.asgi и "
+        "asgiref.wsgi.WsgiToAsgi как есть)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dataset", choices=DATASETS, default="medium",
+            help="Размер набора данных (см. seed_data).",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--concurrency", type=int, default=8,
+            help="Одновременных запросов (и потоков пула).",
+        )
+        parser.add_argument(
+            "--latency-ms", type=float, default=0,
+            help="Задержка каждого запроса к базе: имитация сервера БД "
+            "по сети.",
+        )
+        parser.add_argument(
+            "--output", help="Куда записать результаты в формате JSON."
+        )
+
+    def handle(self, *args, **options):
+        with seeded_database(options["dataset"]):
+            measured = run_server_benchmarks(
+                options["requests"], options["concurrency"],
+                options["latency_ms"],
+            )
+
+        self.stdout.write(
+            f"{'сервер':<20} {'запросов/с':>12} {'мс/запрос':>12}"
+        )
+        for name, metrics in measured.items():
+            self.stdout.write(
+                f"{name:<20} {metrics['requests_per_s']:>12}"
+                f" {metrics['ms_per_request']:>12}"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(
+                    {
+                        "python": platform.python_version(),
+                        "dataset": options["dataset"],
+                        "requests": options["requests"],
+                        "concurrency": options["concurrency"],
+                        "latency_ms": options["latency_ms"],
+                        "servers": measured,
+                    },
+                    output, ensure_ascii=False, indent=2,
+                )
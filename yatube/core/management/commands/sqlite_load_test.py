@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY, text TEXT, comment_count INTEGER DEFAULT 0
+);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT, created REAL
+);
+CREATE INDEX comment_post_created ON comment (post_id, created);
+"""
+POSTS = 100
+
+
+def _worker(path, pragmas, timeout, role, seconds, results):
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    apply_pragmas(connection, pragmas)
+    operations = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        post_id = operations % POSTS + 1
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                # Как add_comment: комментарий и счётчик в одной транзакции.
+                connection.execute("BEGIN")
+                connection.execute(
+                    "INSERT INTO comment (post_id, text, created) "
+                    "VALUES (?, ?, ?)",
+                    (post_id, "комментарий " * 20, time.time()),
+                )
+                connection.execute(
+                    "UPDATE post SET comment_count = comment_count + 1 "
+                    "WHERE id = ?",
+                    (post_id,),
+                )
+                connection.execute("COMMIT")
+            else:
+                # Как post_detail: пост и последние комментарии.
+                connection.execute(
+                    "SELECT * FROM post WHERE id = ?", (post_id,)
+                ).fetchall()
+                connection.execute(
+                    "SELECT * FROM comment WHERE post_id = ? "
+                    "ORDER BY created DESC LIMIT 10",
+                    (post_id,),
+                ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            continue
+        latencies.append(time.perf_counter() - started)
+        operations += 1
+    connection.close()
+    results.put((role, operations, errors, latencies))
+
+
+def _lock_wait(pragmas):
+    """Ожидание блокировки сайта в секундах (busy_timeout) и остальные
+    прагмы: ожидание задаётся обоим профилям одинаково, чтобы они
+    различались только прагмами."""
+    pragmas = dict(pragmas)
+    return pragmas.pop("busy_timeout", 5000) / 1000, pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест SQLite в несколько процессов: параллельные "
+        "чтения и записи комментариев со стандартными настройками и с "
+        "прагмами из SQLITE_PRAGMAS при одинаковом ожидании блокировки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument(
+            "--timeout", type=float,
+            help="Секунд ждать блокировку в обоих профилях (по умолчанию "
+            "busy_timeout из SQLITE_PRAGMAS).",
+        )
+
+    def handle(self, *args, **options):
+        timeout, pragmas = _lock_wait(settings.SQLITE_PRAGMAS)
+        if options["timeout"] is None:
+            options["timeout"] = timeout
+        profiles = [
+            ("стандартный", {}),
+            ("SQLITE_PRAGMAS", pragmas),
+        ]
+        self.stdout.write(f"Ожидание блокировки: {options['timeout']:g} с")
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "load.sqlite3")
+                self.prepare(path)
+                stats = self.run_profile(path, pragmas, options)
+            self.stdout.write(f"{name}:")
+            for role, (operations, errors, latencies) in stats.items():
+                latencies.sort()
+                p95 = 0
+                if latencies:
+                    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+                self.stdout.write(
+                    f"  {role}: {operations / options['seconds']:.0f} оп/с, "
+                    f"ошибок блокировки {errors}, p95 {p95:.1f} мс"
+                )
+
+    def prepare(self, path):
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO post (text) VALUES (?)",
+            [("пост",)] * POSTS,
+        )
+        connection.commit()
+        connection.close()
+
+    def run_profile(self, path, pragmas, options):
+        results = multiprocessing.Queue()
+        roles = (
+            ["reader"] * options["readers"] + ["writer"] * options["writers"]
+        )
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(path, pragmas, options["timeout"], role,
+                      options["seconds"], results),
+            )
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        stats = {"reader": [0, 0, []], "writer": [0, 0, []]}
+        for _ in processes:
+            role, operations, errors, latencies = results.get()
+            stats[role][0] += operations
+            stats[role][1] += errors
+            stats[role][2].extend(latencies)
+        for process in processes:
+            process.join()
+        return stats
@@ -0,0 +1,66 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def sqlite_path(name):
+    """Путь к файлу из NAME SQLite, в том числе из URI вида
+    file:replica.sqlite3?mode=ro."""
+    if name.startswith("file:"):
+        return name[len("file:"):].split("?")[0]
+    return name
+
+
+def copy_database(alias):
+    """Копирует default в SQLite-реплику `alias` через backup API: копия
+    согласованная, даже если в default в это время пишут."""
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    target = sqlite3.connect(
+        sqlite_path(connections[alias].settings_dict["NAME"])
+    )
+    try:
+        source.connection.backup(target)
+        # Соединения с репликой открываются только для чтения и сами
+        # включить WAL из SQLITE_PRAGMAS не могут.
+        target.execute("PRAGMA journal_mode = wal")
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует базу default в SQLite-реплики из DATABASE_REPLICAS - "
+        "локальная замена репликации для проверки core.replicas. С "
+        "--interval повторяет копирование, изображая отставание реплик."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Копировать каждые N секунд, пока не прервут.",
+        )
+
+    def handle(self, *args, **options):
+        aliases = list(settings.DATABASE_REPLICAS)
+        if not aliases:
+            raise CommandError("DATABASE_REPLICAS пуст.")
+        for alias in aliases:
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(
+                    f"{alias}: не SQLite, такие реплики обновляет СУБД."
+                )
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                copy_database(alias)
+            self.stdout.write(
+                f"Реплики {', '.join(aliases)} обновлены за "
+                f"{time.perf_counter() - started:.2f} с"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
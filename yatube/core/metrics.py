@@ -0,0 +1,160 @@
+"""Метрики запросов в памяти процесса и их вывод в формате Prometheus.
+
+Гистограммы копятся отдельно в каждом процессе веб-сервера: Prometheus
+опрашивает процессы по отдельности (или через общий адрес, и тогда
+значения усредняются по опросам). Запись одной метрики - поиск корзины
+и сложение под блокировкой, поэтому сбор можно не выключать.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Границы корзин гистограмм, как у клиентов Prometheus по умолчанию.
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    "yatube_request_duration_seconds": (
+        "Время обработки запроса.", SECONDS_BUCKETS,
+    ),
+    "yatube_request_db_seconds": (
+        "Время SQL-запросов за один HTTP-запрос.", SECONDS_BUCKETS,
+    ),
+    "yatube_request_db_queries": (
+        "Число SQL-запросов за один HTTP-запрос.", QUERIES_BUCKETS,
+    ),
+    "yatube_request_template_seconds": (
+        "Время рендеринга шаблонов за один HTTP-запрос.", SECONDS_BUCKETS,
+    ),
+    "yatube_response_size_bytes": (
+        "Размер тела ответа.", BYTES_BUCKETS,
+    ),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_histograms = {}
+_responses = {}
+_collectors = []
+_current = threading.local()
+
+
+def observe(view, status, **values):
+    """Записывает метрики одного запроса: `values` - значения для
+    гистограмм HISTOGRAMS без префикса yatube_."""
+    with _lock:
+        key = (view, str(status))
+        _responses[key] = _responses.get(key, 0) + 1
+        for name, value in values.items():
+            name = f"yatube_{name}"
+            histogram = _histograms.get((name, view))
+            if histogram is None:
+                histogram = _histograms[(name, view)] = Histogram(
+                    HISTOGRAMS[name][1]
+                )
+            histogram.observe(value)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _responses.clear()
+
+
+def register_collector(collector):
+    """Добавляет источник метрик: функцию без аргументов, которая
+    возвращает строки в текстовом формате Prometheus."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+@contextmanager
+def track_request():
+    """Открывает счёт времени шаблонов для текущего потока."""
+    _current.template_seconds = 0.0
+    _current.template_depth = 0
+    try:
+        yield _current
+    finally:
+        del _current.template_seconds, _current.template_depth
+
+
+@contextmanager
+def timed_template():
+    """Считает время рендеринга шаблона текущего запроса; вложенный
+    рендеринг (render_to_string внутри шаблона) не учитывается дважды."""
+    if not hasattr(_current, "template_seconds"):
+        yield
+        return
+    _current.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.template_depth -= 1
+        if not _current.template_depth:
+            _current.template_seconds += time.perf_counter() - started
+
+
+def _label(value):
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        histograms = {
+            key: (list(histogram.counts), histogram.sum)
+            for key, histogram in _histograms.items()
+        }
+        responses = dict(_responses)
+
+    lines = [
+        "# HELP yatube_requests_total Обработано запросов.",
+        "# TYPE yatube_requests_total counter",
+    ]
+    for (view, status), count in sorted(responses.items()):
+        lines.append(
+            f'yatube_requests_total{{view="{_label(view)}",'
+            f'status="{status}"}} {count}'
+        )
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, view), (counts, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            view = _label(view)
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{view="{view}",le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f'{name}_sum{{view="{view}"}} {_number(total)}')
+            lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
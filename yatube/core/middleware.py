@@ -0,0 +1,234 @@
+import logging
+import mimetypes
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import DatabaseError, connections
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import metrics, replicas
+from .querywatch import QueryWatcher, describe
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса по имени маршрута: время ответа, время
+    и число SQL-запросов, время шаблонов и размер ответа.
+
+    Стоит в MIDDLEWARE первым после раздачи статики, чтобы учитывать
+    работу остальных.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db = {"seconds": 0.0, "queries": 0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db["seconds"] += time.perf_counter() - started
+                db["queries"] += 1
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(count_query)
+                )
+            tracked = stack.enter_context(metrics.track_request())
+            response = self.get_response(request)
+            template_seconds = tracked.template_seconds
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        if view == "metrics":
+            return response
+        values = {
+            "request_duration_seconds": duration,
+            "request_db_seconds": db["seconds"],
+            "request_db_queries": db["queries"],
+            "request_template_seconds": template_seconds,
+        }
+        if not response.streaming:
+            values["response_size_bytes"] = len(response.content)
+        metrics.observe(view, response.status_code, **values)
+        return response
+
+
+class QueryWatchMiddleware:
+    """Пишет в лог медленные запросы и N+1 каждого HTTP-запроса.
+
+    Включается настройкой QUERY_WATCH_ENABLED, например на стейджинге:
+    разбор стека на каждый SQL-запрос в продакшене слишком дорог.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_WATCH_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryWatcher() as watcher:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        for finding in watcher.findings():
+            logger.warning("%s %s: %s", view, request.path, describe(finding))
+        return response
+
+
+class ReplicaFailed(HttpResponse):
+    """Ответ DatabaseReplicaMiddleware.process_exception: представление
+    упало на реплике, запрос будет выполнен заново из default."""
+
+    status_code = 503
+
+
+class DatabaseReplicaMiddleware:
+    """Границы запроса для core.replicas и read-your-writes.
+
+    Запрос, который что-то записал, ставит cookie со временем, до
+    которого этот пользователь читает из default: реплики успеют получить
+    его запись. Без DATABASE_REPLICAS не подключается. Состояние запроса
+    сбрасывается по request_finished (core.apps), когда ответ закрыт:
+    потоковые ответы читают базу уже после выхода из middleware.
+
+    Если представление упало с ошибкой базы, читая с реплики (реплика
+    оборвала соединение, её файл испорчен или отстал от схемы), реплика
+    помечается упавшей, а безопасный запрос целиком, со всеми
+    middleware, выполняется заново из default.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            sticky_until = float(
+                request.COOKIES.get(settings.DATABASE_STICKY_COOKIE, 0)
+            )
+        except ValueError:
+            sticky_until = 0
+        replicas.start_request(
+            pinned=request.method not in ("GET", "HEAD", "OPTIONS")
+            or sticky_until > time.time()
+        )
+        response = self.get_response(request)
+        if isinstance(response, ReplicaFailed):
+            # fail_over уже перевёл чтение на default, поэтому повтор
+            # не вернёт ReplicaFailed снова.
+            response = self.get_response(request)
+        if replicas.wrote():
+            response.set_cookie(
+                settings.DATABASE_STICKY_COOKIE,
+                str(int(time.time() + settings.DATABASE_STICKY_SECONDS)),
+                max_age=settings.DATABASE_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_exception(self, request, exception):
+        # Стоит в начале MIDDLEWARE, поэтому process_exception остальных
+        # middleware к этому моменту уже отработали.
+        alias = replicas.current_replica()
+        if (
+            alias is None
+            or not isinstance(exception, DatabaseError)
+            or request.method not in ("GET", "HEAD", "OPTIONS")
+        ):
+            return None
+        replicas.fail_over(alias)
+        return ReplicaFailed()
+
+
+class StaticFilesMiddleware:
+    """Отдаёт статику из STATIC_ROOT в продакшене.
+
+    Из заранее сжатых вариантов (core.storage) выбирается лучший, который
+    принимает клиент: br, затем gzip, затем исходный файл. Файлы с хэшем
+    содержимого в имени кэшируются навсегда (immutable), остальные -
+    на STATIC_MAX_AGE секунд. При DEBUG статику раздаёт runserver.
+    """
+
+    encodings = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.hashed = set(
+            getattr(staticfiles_storage, "hashed_files", {}).values()
+        )
+
+    def __call__(self, request):
+        if (
+            request.method in ("GET", "HEAD")
+            and request.path.startswith(self.prefix)
+        ):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def accepted_encodings(self, request):
+        accepted = {}
+        header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        for item in header.split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[coding.strip().lower()] = quality
+        return {coding for coding, quality in accepted.items() if quality > 0}
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        accepted = self.accepted_encodings(request)
+        encoding = None
+        for coding, extension in self.encodings:
+            if coding in accepted and os.path.isfile(path + extension):
+                encoding, path = coding, path + extension
+                break
+
+        content_type = mimetypes.guess_type(name)[0]
+        response = FileResponse(
+            open(path, "rb"),
+            filename=os.path.basename(name),
+            content_type=content_type or "application/octet-stream",
+        )
+        if encoding:
+            response["Content-Encoding"] = encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if name in self.hashed:
+            response["Cache-Control"] = (
+                "public, max-age=31536000, immutable"
+            )
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.STATIC_MAX_AGE
+            )
+        return response
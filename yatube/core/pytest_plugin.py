@@ -0,0 +1,115 @@
+"""Плагин pytest: тест падает, если HTTP-запрос внутри него выполнил
+SELECT одной формы QUERY_WATCH_REPEAT раз и больше (N+1).
+
+Обычный запуск ``py.test`` плагин не загружает: тесты курса не должны
+падать из-за N+1. Проверка запускается отдельно (отдельный шаг в CI),
+проект должен быть в пути импорта до загрузки плагина::
+
+    PYTHONPATH=yatube pytest -p core.pytest_plugin \
+        --query-baseline=yatube/core/querywatch_baseline.json
+
+Запросы считаются отдельно для каждого запроса тестового клиента,
+поэтому создание данных в фикстурах и в самом тесте не мешает.
+
+Чтобы падали только новые N+1, известные записываются в файл:
+``--query-baseline=файл --query-baseline-update`` сохраняет все находки
+прогона, а ``--query-baseline=файл`` затем пропускает их. Тест с
+намеренными повторами помечается ``@pytest.mark.allow_repeated_queries``.
+"""
+import json
+import os
+
+import pytest
+from django.core.signals import request_finished, request_started
+from django.urls import Resolver404, resolve
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("querywatch", "поиск N+1")
+    group.addoption(
+        "--query-repeat", type=int, default=None,
+        help="Сколько одинаковых SELECT за HTTP-запрос считать N+1 "
+             "(по умолчанию QUERY_WATCH_REPEAT).",
+    )
+    group.addoption(
+        "--query-baseline", default=None,
+        help="JSON-файл с известными N+1, которые не роняют тесты.",
+    )
+    group.addoption(
+        "--query-baseline-update", action="store_true",
+        help="Не ронять тесты, а записать все находки в --query-baseline.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "allow_repeated_queries: не проверять тест на N+1",
+    )
+    config._query_baseline = set()
+    config._query_found = set()
+    path = config.getoption("--query-baseline")
+    if path and os.path.exists(path) and not config.getoption(
+        "--query-baseline-update"
+    ):
+        with open(path, encoding="utf-8") as baseline:
+            config._query_baseline = set(json.load(baseline))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    path = config.getoption("--query-baseline")
+    if path and config.getoption("--query-baseline-update"):
+        with open(path, "w", encoding="utf-8") as baseline:
+            json.dump(
+                sorted(config._query_found), baseline,
+                ensure_ascii=False, indent=2,
+            )
+            baseline.write("\n")
+
+
+def _view_name(path):
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return None
+
+
+@pytest.fixture(autouse=True)
+def _watch_repeated_queries(request):
+    if request.node.get_closest_marker("allow_repeated_queries"):
+        yield
+        return
+    from .querywatch import QueryWatcher, baseline_key, describe
+
+    config = request.config
+    repeat = config.getoption("--query-repeat")
+    watchers, findings = [], []
+
+    def started(sender, environ=None, **kwargs):
+        watcher = QueryWatcher(repeat=repeat)
+        watcher.path = (environ or {}).get("PATH_INFO", "")
+        watchers.append(watcher.__enter__())
+
+    def finished(sender, **kwargs):
+        if not watchers:
+            return
+        watcher = watchers.pop()
+        watcher.__exit__(None, None, None)
+        view = _view_name(watcher.path)
+        for finding in watcher.repeated():
+            key = baseline_key(finding, view)
+            config._query_found.add(key)
+            if key not in config._query_baseline:
+                findings.append(f"{watcher.path}: {describe(finding)}")
+
+    request_started.connect(started, dispatch_uid="query_watch_started")
+    request_finished.connect(finished, dispatch_uid="query_watch_finished")
+    try:
+        yield
+    finally:
+        request_started.disconnect(dispatch_uid="query_watch_started")
+        request_finished.disconnect(dispatch_uid="query_watch_finished")
+        while watchers:
+            watchers.pop().__exit__(None, None, None)
+    if findings and not config.getoption("--query-baseline-update"):
+        pytest.fail("N+1 в запросах:\n" + "\n".join(findings), pytrace=False)
@@ -0,0 +1,155 @@
+"""Поиск медленных запросов и N+1.
+
+QueryWatcher записывает SQL-запросы, выполненные внутри блока `with`,
+вместе с местом, откуда они пришли: строкой шаблона и строкой кода
+проекта. Запросы одной формы (SQL без значений) группируются - десяток
+одинаковых SELECT на страницу почти всегда означает N+1, например
+`{{ post.author }}` в цикле без select_related.
+
+Используется в QueryWatchMiddleware (включается QUERY_WATCH_ENABLED),
+в плагине pytest core.pytest_plugin и напрямую в тестах.
+"""
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+Finding = namedtuple(
+    "Finding", "kind shape count total_ms template caller sql"
+)
+
+# Обёртки самого сбора метрик - не место, откуда пришёл запрос.
+_OWN_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ("querywatch.py", "middleware.py", "template_backends.py")
+}
+_IN_LIST = re.compile(r"\bIN \((?:%s, )*%s\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def query_shape(sql):
+    """SQL без значений: запросы, различающиеся только id или длиной
+    списка IN, получают одну форму."""
+    return _LITERAL.sub("?", _IN_LIST.sub("IN (...)", sql))
+
+
+def _origin():
+    """Самая глубокая строка шаблона и ближайшая строка кода проекта
+    в текущем стеке вызовов."""
+    template = caller = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and caller):
+        if template is None:
+            node = frame.f_locals.get("self")
+            # type(), а не isinstance(): isinstance вычислил бы ленивые
+            # объекты вроде request.user и выполнил бы новый запрос.
+            if issubclass(type(node), Node) and getattr(node, "token", None):
+                template = f"{node.origin.template_name}:{node.token.lineno}"
+        filename = frame.f_code.co_filename
+        if (
+            caller is None
+            and filename.startswith(settings.BASE_DIR)
+            and "site-packages" not in filename
+            and filename not in _OWN_FILES
+        ):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            caller = f"{path}:{frame.f_lineno}"
+        frame = frame.f_back
+    return template, caller
+
+
+class QueryWatcher:
+    """Контекстный менеджер, записывающий запросы ко всем базам."""
+
+    def __init__(self, slow_ms=None, repeat=None):
+        self.slow_ms = (
+            settings.QUERY_WATCH_SLOW_MS if slow_ms is None else slow_ms
+        )
+        self.repeat = settings.QUERY_WATCH_REPEAT if repeat is None else repeat
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self._record)
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.queries.append((sql, duration) + _origin())
+
+    def slow(self):
+        """Запросы дольше порога, по одному на форму."""
+        findings = {}
+        for sql, duration, template, caller in self.queries:
+            if duration < self.slow_ms:
+                continue
+            shape = query_shape(sql)
+            finding = findings.get(shape)
+            if finding is None or finding.total_ms < duration:
+                findings[shape] = Finding(
+                    "slow", shape, 1, duration, template, caller, sql
+                )
+        return list(findings.values())
+
+    def repeated(self):
+        """SELECT одной формы, выполненные не меньше `repeat` раз, - с
+        местом первого из них."""
+        groups = {}
+        for sql, duration, template, caller in self.queries:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            shape = query_shape(sql)
+            group = groups.setdefault(
+                shape, [0, 0.0, template, caller, sql]
+            )
+            group[0] += 1
+            group[1] += duration
+        return [
+            Finding("repeated", shape, count, total, template, caller, sql)
+            for shape, (count, total, template, caller, sql)
+            in groups.items()
+            if count >= self.repeat
+        ]
+
+    def findings(self):
+        return self.slow() + self.repeated()
+
+
+def baseline_key(finding, view=None):
+    """Ключ находки в списке известных: view, шаблон (или модуль) и форма
+    запроса. Без номера строки: правка выше по файлу не меняет ключ."""
+    place = finding.template or finding.caller
+    if place:
+        place = place.rsplit(":", 1)[0]
+    return ": ".join(part for part in (view, place, finding.shape) if part)
+
+
+def describe(finding):
+    where = ", ".join(
+        place for place in (finding.template, finding.caller) if place
+    )
+    if finding.kind == "slow":
+        summary = f"медленный запрос {finding.total_ms:.1f} мс"
+    else:
+        summary = (
+            f"{finding.count} одинаковых запросов за "
+            f"{finding.total_ms:.1f} мс"
+        )
+    return f"{summary} ({where or 'место неизвестно'}): {finding.shape}"
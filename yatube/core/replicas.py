@@ -0,0 +1,162 @@
+"""Чтение с реплик базы данных.
+
+ReplicaRouter отправляет чтение моделей из DATABASE_REPLICA_APPS на
+реплики из DATABASE_REPLICAS ({алиас: вес}), запись - всегда в default.
+Реплика выбирается случайно с учётом весов один раз на HTTP-запрос: все
+запросы страницы видят одно и то же состояние данных.
+
+Чтение идёт из default, если:
+- запрос изменяет данные (не GET/HEAD/OPTIONS) - форма видит то же, что
+  сохранит;
+- в этом потоке уже была запись или открыта транзакция в default -
+  например, сигналы после сохранения поста;
+- пользователь недавно что-то записал (cookie DATABASE_STICKY_COOKIE,
+  её ставит core.middleware.DatabaseReplicaMiddleware): реплика могла
+  ещё не получить его пост или комментарий (read-your-writes);
+- ответ попадёт в общий кэш страниц (primary_reads): страница,
+  прочитанная с отстающей реплики, осталась бы в кэше под новым
+  поколением ленты;
+- ни одна реплика не отвечает. Реплика, к которой не удалось
+  подключиться или на которой упал запрос, пропускается
+  DATABASE_REPLICA_RETRY_SECONDS секунд; запрос, упавший на реплике,
+  core.middleware.DatabaseReplicaMiddleware повторяет на default.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Состояние текущего запроса (потока): выбранная реплика и признаки
+# "читать из default" и "была запись".
+_state = threading.local()
+# Алиас реплики -> time.monotonic(), до которого она считается упавшей.
+_down_until = {}
+
+
+def start_request(pinned=False):
+    _state.replica = None
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def end_request(**kwargs):
+    """Сбрасывает состояние запроса. Вызывается по request_finished, то
+    есть когда ответ закрыт: потоковый ответ читает базу, пока отдаётся,
+    и до конца должен читать оттуда же."""
+    start_request()
+
+
+def wrote():
+    """Записывал ли текущий запрос модели DATABASE_REPLICA_APPS."""
+    return getattr(_state, "wrote", False)
+
+
+@contextmanager
+def primary_reads():
+    """Чтение из default внутри блока."""
+    pinned = getattr(_state, "pinned", False)
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned or getattr(_state, "wrote", False)
+
+
+def current_replica():
+    """Реплика, с которой читает текущий запрос; None - ещё не выбрана
+    или чтение идёт из default."""
+    replica = getattr(_state, "replica", None)
+    return None if replica == DEFAULT_DB_ALIAS else replica
+
+
+def fail_over(alias):
+    """Запрос к реплике `alias` упал: реплика помечается упавшей, а
+    остаток HTTP-запроса читает из default."""
+    logger.warning("Ошибка запроса к реплике %s", alias, exc_info=True)
+    mark_down(alias)
+    connections[alias].close()
+    _state.replica = None
+    _state.pinned = True
+
+
+def mark_down(alias):
+    _down_until[alias] = (
+        time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+    )
+
+
+def is_healthy(alias):
+    """Реплика не помечена упавшей и к ней удаётся подключиться.
+    Открытое соединение не проверяется заново."""
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning("Реплика %s недоступна", alias, exc_info=True)
+        mark_down(alias)
+        return False
+    _down_until.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """Случайная живая реплика с учётом весов; если живых нет -
+    default."""
+    candidates = {
+        alias: weight
+        for alias, weight in settings.DATABASE_REPLICAS.items()
+        if weight > 0
+    }
+    while candidates:
+        [alias] = random.choices(
+            list(candidates), weights=list(candidates.values())
+        )
+        if is_healthy(alias):
+            return alias
+        del candidates[alias]
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or model._meta.app_label not in settings.DATABASE_REPLICA_APPS
+        ):
+            return None
+        if (
+            getattr(_state, "pinned", False)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        if getattr(_state, "replica", None) is None:
+            _state.replica = choose_replica()
+        return _state.replica
+
+    def db_for_write(self, model, **hints):
+        # Сессии и last_login не в счёт: реплики отдают только модели
+        # DATABASE_REPLICA_APPS.
+        if model._meta.app_label in settings.DATABASE_REPLICA_APPS:
+            _state.pinned = True
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default: объекты с них связываются свободно.
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему реплики получают вместе с данными из default.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,55 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # без brotli собираются только .gz
+    brotli = None
+
+# Эти форматы уже сжаты: повторное сжатие только тратит время сборки.
+SKIP_EXTENSIONS = {
+    ".br", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico",
+    ".woff", ".woff2", ".zip", ".mp4",
+}
+MIN_SIZE = 256
+
+
+def compressed_variants(content):
+    """Сжатые варианты файла: {расширение: байты}. Вариант не пишется,
+    если он не меньше исходника."""
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return {
+        extension: data
+        for extension, data in variants.items()
+        if len(data) < len(content)
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+    collectstatic пишет рядом с каждым файлом app.3f2a9c1b7e4d.css
+    варианты .gz и .br; core.middleware.StaticFilesMiddleware отдаёт
+    нужный по Accept-Encoding, ничего не сжимая на лету.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in SKIP_EXTENSIONS:
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            if len(content) < MIN_SIZE:
+                continue
+            for extension, data in compressed_variants(content).items():
+                path = self.path(name + extension)
+                with open(path, "wb") as compressed:
+                    compressed.write(data)
@@ -0,0 +1,31 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (
+    DjangoTemplates, Template, reraise,
+)
+
+from .metrics import timed_template
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed_template():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Обычный бэкенд Django, который засекает время загрузки и
+    рендеринга шаблонов для метрик запроса
+    (core.middleware.MetricsMiddleware)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        # Загрузка тоже в счёт: без кэша шаблон разбирается здесь.
+        with timed_template():
+            try:
+                return TimedTemplate(
+                    self.engine.get_template(template_name), self
+                )
+            except TemplateDoesNotExist as exc:
+                reraise(exc, self)
@@ -0,0 +1,95 @@
+"""Загрузка шаблонов из памяти.
+
+В продакшене шаблоны берёт стандартный cached.Loader, а при старте
+процесса `precompile_templates` (вызывается из core.apps) заранее
+компилирует все шаблоны проекта: ошибка синтаксиса роняет запуск, а не
+первый запрос к странице. При DEBUG шаблоны тоже кэшируются, но
+ReloadingLoader перечитывает изменённый файл.
+"""
+import os
+
+from django.conf import settings
+from django.template import Template, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders import cached
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ReloadingLoader(cached.Loader):
+    """Кэширующий загрузчик для разработки.
+
+    Скомпилированный шаблон берётся из памяти, пока не изменился его
+    файл; перечитывается только изменённый шаблон. extends и include
+    получают шаблоны при рендеринге через этот же загрузчик, поэтому
+    правка base.html сразу видна на всех страницах. Ненайденные шаблоны
+    не кэшируются: новый файл подхватывается без перезапуска.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine, loaders)
+        self.mtimes = {}
+
+    def get_template(self, template_name, skip=None):
+        key = self.cache_key(template_name, skip)
+        cached_template = self.get_template_cache.get(key)
+        if cached_template is not None and (
+            not isinstance(cached_template, Template)
+            or self.mtimes.get(key) != _mtime(cached_template.origin.name)
+        ):
+            del self.get_template_cache[key]
+        if key in self.get_template_cache:
+            return super().get_template(template_name, skip)
+        template = super().get_template(template_name, skip)
+        self.mtimes[key] = _mtime(template.origin.name)
+        return template
+
+    def reset(self):
+        super().reset()
+        self.mtimes.clear()
+
+
+def _template_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, "loaders"):
+            yield from _template_dirs(loader.loaders)
+        elif hasattr(loader, "get_dirs"):
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена всех шаблонов проекта в каталогах загрузчиков движка: из
+    DIRS и из templates/ приложений проекта. Шаблоны пакетов вроде
+    django.contrib не трогаем."""
+    dirs = [
+        directory for directory in _template_dirs(engine.template_loaders)
+        if directory in engine.dirs
+        or str(directory).startswith(settings.BASE_DIR)
+    ]
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.startswith("."):
+                    continue
+                path = os.path.relpath(os.path.join(root, filename), directory)
+                names.add(path.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def precompile_templates():
+    """Компилирует все шаблоны проекта в кэш загрузчиков и возвращает
+    их число. TemplateSyntaxError пробрасывается сразу."""
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            backend.engine.get_template(name)
+            count += 1
+    return count
@@ -0,0 +1,49 @@
+from django import template
+from django.http import QueryDict
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    """Номера страниц для навигации: первые и последние `on_ends`
+    и по `on_each_side` вокруг текущей; пропуски обозначены `None`.
+
+    Длина списка не зависит от числа страниц, поэтому навигация
+    по ленте из сотен тысяч постов рисуется так же быстро, как по одной.
+    """
+    number = page_obj.number
+    num_pages = page_obj.paginator.num_pages
+    pages = sorted(
+        {
+            *range(1, min(on_ends, num_pages) + 1),
+            *range(
+                max(number - on_each_side, 1),
+                min(number + on_each_side, num_pages) + 1,
+            ),
+            *range(max(num_pages - on_ends + 1, 1), num_pages + 1),
+        }
+    )
+    window = []
+    for page in pages:
+        if window and page - window[-1] == 2:
+            # Многоточие вместо единственной страницы не экономит места.
+            window.append(page - 1)
+        elif window and page - window[-1] > 2:
+            window.append(None)
+        window.append(page)
+    return window
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, **params):
+    """Ссылка на другую страницу с сохранением остальных GET-параметров
+    (например, поискового запроса); параметр со значением None убирается.
+    """
+    request = context.get("request")
+    query = request.GET.copy() if request else QueryDict(mutable=True)
+    for name, value in params.items():
+        query.pop(name, None)
+        if value is not None:
+            query[name] = value
+    return f"?{query.urlencode()}"
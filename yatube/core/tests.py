@@ -0,0 +1,603 @@
+import asyncio
+import gzip
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.http import HttpResponse
+from django.template import TemplateSyntaxError, engines
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from posts.models import Post
+
+from . import metrics, replicas
+from .asgi import ThreadedWsgiToAsgi
+from .benchmarks import SERVERS, run_server_benchmarks
+from .db import configure_sqlite
+from .management.commands.sqlite_load_test import _lock_wait
+from .management.commands.sync_replicas import copy_database
+from .middleware import StaticFilesMiddleware
+from .querywatch import QueryWatcher, baseline_key, query_shape
+from .storage import brotli
+from .template_loaders import precompile_templates
+
+POST_CARD = "includes/post_card.html"
+
+User = get_user_model()
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    databases = {"default"}
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_connection_gets_pragmas(self):
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), 20000)
+        self.assertEqual(self.pragma("cache_size"), -64000)
+
+    def test_pragmas_are_configurable(self):
+        with override_settings(SQLITE_PRAGMAS={"cache_size": -1000}):
+            configure_sqlite(sender=None, connection=connection)
+            self.assertEqual(self.pragma("cache_size"), -1000)
+        configure_sqlite(sender=None, connection=connection)
+        self.assertEqual(self.pragma("cache_size"), -64000)
+
+    def test_load_test_profiles_share_lock_wait(self):
+        timeout, pragmas = _lock_wait(settings.SQLITE_PRAGMAS)
+        self.assertEqual(timeout, 20)
+        self.assertNotIn("busy_timeout", pragmas)
+        self.assertEqual(pragmas["journal_mode"], "wal")
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0, METRICS_TOKEN="secret")
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+        author = get_user_model().objects.create_user("auth")
+        Post.objects.create(author=author, text="пост")
+
+    def scrape(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def value(self, text, line_start):
+        for line in text.splitlines():
+            if line.startswith(line_start):
+                return float(line.rsplit(" ", 1)[1])
+        self.fail(f"нет метрики {line_start}")
+
+    def test_request_metrics_by_view_name(self):
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+        self.client.get("/no-such-page/")
+        text = self.scrape()
+
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"} 2', text
+        )
+        self.assertIn(
+            'yatube_requests_total{view="<unresolved>",status="404"} 1', text
+        )
+        view = '{view="posts:index"}'
+        # COUNT для паджинатора и страница постов на каждый запрос
+        self.assertEqual(
+            self.value(text, f"yatube_request_db_queries_sum{view}"), 4
+        )
+        self.assertGreater(
+            self.value(text, f"yatube_request_template_seconds_sum{view}"), 0
+        )
+        self.assertGreater(
+            self.value(text, f"yatube_response_size_bytes_sum{view}"), 0
+        )
+        self.assertEqual(
+            self.value(
+                text,
+                'yatube_request_duration_seconds_bucket'
+                '{view="posts:index",le="+Inf"}',
+            ),
+            2,
+        )
+        self.assertIn('yatube_page_cache_events_total{event="hits"}', text)
+        self.assertNotIn('view="metrics"', text)
+
+    def test_endpoint_requires_token(self):
+        # Адрес 127.0.0.1, как у запросов через локальный прокси.
+        for authorization in ("", "Bearer wrong", "Basic secret"):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    reverse("metrics"), HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_endpoint_disabled_without_token(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer None"
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryWatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            author = get_user_model().objects.create_user(f"user_{i}")
+            Post.objects.create(author=author, text=f"пост {i}")
+
+    def test_query_shape_ignores_values(self):
+        self.assertEqual(
+            query_shape(
+                "SELECT * FROM t WHERE id IN (%s, %s, %s) AND n > 10 "
+                "AND s = 'x'"
+            ),
+            "SELECT * FROM t WHERE id IN (...) AND n > ? AND s = ?",
+        )
+
+    def test_baseline_key_ignores_line_numbers(self):
+        with QueryWatcher(repeat=5) as watcher:
+            for post in Post.objects.all():
+                render_to_string(POST_CARD, {"post": post})
+        [finding] = watcher.repeated()
+        key = baseline_key(finding, "posts:index")
+        self.assertTrue(key.startswith(f"posts:index: {POST_CARD}: SELECT"))
+        self.assertEqual(
+            baseline_key(finding._replace(template=f"{POST_CARD}:99")),
+            baseline_key(finding),
+        )
+
+    def test_finds_n_plus_one_with_template_line(self):
+        with QueryWatcher(repeat=5) as watcher:
+            for post in Post.objects.all():
+                render_to_string(POST_CARD, {"post": post})
+        [finding] = watcher.repeated()
+        self.assertEqual(finding.count, 5)
+        self.assertIn('FROM "auth_user"', finding.shape)
+        self.assertEqual(finding.template, f"{POST_CARD}:7")
+        self.assertTrue(finding.caller.startswith("core/tests.py:"))
+
+        with QueryWatcher(repeat=5) as watcher:
+            for post in Post.objects.select_related("author"):
+                render_to_string(POST_CARD, {"post": post})
+        self.assertEqual(watcher.repeated(), [])
+
+    @override_settings(
+        QUERY_WATCH_ENABLED=True,
+        QUERY_WATCH_SLOW_MS=0,
+        POSTS_PAGE_CACHE_TIMEOUT=0,
+    )
+    def test_middleware_logs_findings(self):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(reverse("posts:index"))
+        self.assertIn("posts:index /: медленный запрос", logs.output[0])
+
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE="core.storage.CompressedManifestStaticFilesStorage",
+)
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.css = staticfiles_storage.stored_name("css/bootstrap.min.css")
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse(status=404)
+        )
+
+    def get(self, name, **headers):
+        request = RequestFactory().get(f"/static/{name}", **headers)
+        return self.middleware(request)
+
+    def test_collectstatic_writes_compressed_variants(self):
+        self.assertNotEqual(self.css, "css/bootstrap.min.css")
+        path = os.path.join(STATIC_ROOT, self.css)
+        with open(path, "rb") as original:
+            content = original.read()
+        with open(path + ".gz", "rb") as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), content)
+        if brotli is not None:
+            with open(path + ".br", "rb") as compressed:
+                self.assertEqual(brotli.decompress(compressed.read()), content)
+        # Картинки уже сжаты.
+        logo = staticfiles_storage.stored_name("img/logo.png")
+        self.assertFalse(
+            os.path.exists(os.path.join(STATIC_ROOT, logo + ".gz"))
+        )
+
+    def test_picks_best_accepted_encoding(self):
+        cases = [
+            ("gzip, deflate, br", "br" if brotli else "gzip"),
+            ("gzip, br;q=0", "gzip"),
+            ("gzip;q=0", None),
+            ("", None),
+        ]
+        for header, encoding in cases:
+            with self.subTest(accept_encoding=header):
+                response = self.get(self.css, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.get("Content-Encoding"), encoding)
+                self.assertEqual(response["Content-Type"], "text/css")
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_cache_control(self):
+        response = self.get(self.css)
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+        with self.settings(STATIC_MAX_AGE=60):
+            response = self.get("css/bootstrap.min.css")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+
+    def test_missing_files_fall_through(self):
+        for name in ("css/missing.css", "../manage.py", "css"):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+
+TEMPLATE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(TEMPLATES=[{
+    "BACKEND": "django.template.backends.django.DjangoTemplates",
+    "DIRS": [TEMPLATE_DIR],
+    "OPTIONS": {"loaders": [(
+        "core.template_loaders.ReloadingLoader",
+        ["django.template.loaders.filesystem.Loader"],
+    )]},
+}])
+class ReloadingLoaderTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMPLATE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, name, content, shift=0):
+        path = os.path.join(TEMPLATE_DIR, name)
+        with open(path, "w") as template:
+            template.write(content)
+        # Время изменения явно сдвигается: запись в ту же секунду на
+        # некоторых файловых системах его не меняет.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + shift))
+
+    def render(self, name):
+        return engines.all()[0].get_template(name).render().strip()
+
+    def test_reloads_only_changed_templates(self):
+        self.write("base.html", "[{% block body %}{% endblock %}]")
+        self.write("page.html", (
+            '{% extends "base.html" %}{% block body %}стр{% endblock %}'
+        ))
+        engine = engines.all()[0].engine
+        self.assertEqual(self.render("page.html"), "[стр]")
+        page = engine.get_template("page.html")
+        self.assertIs(engine.get_template("page.html"), page)
+
+        self.write(
+            "base.html", "<{% block body %}{% endblock %}>", 10 ** 9
+        )
+        self.assertEqual(self.render("page.html"), "<стр>")
+        self.assertIs(engine.get_template("page.html"), page)
+
+    def test_new_template_is_found(self):
+        engine = engines.all()[0].engine
+        with self.assertRaises(Exception):
+            engine.get_template("new.html")
+        self.write("new.html", "новый")
+        self.assertEqual(self.render("new.html"), "новый")
+
+
+class PrecompileTemplatesTest(SimpleTestCase):
+    def test_all_project_templates_compile(self):
+        self.assertGreaterEqual(precompile_templates(), 25)
+
+    def test_syntax_error_fails_fast(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(os.path.join(directory, "broken.html"), "w") as template:
+            template.write("{% if %}")
+        templates = [{
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [directory],
+        }]
+        with self.settings(TEMPLATES=templates):
+            with self.assertRaises(TemplateSyntaxError):
+                precompile_templates()
+
+
+class AsgiTest(SimpleTestCase):
+    def serve(self, application, paths, method="GET", body=b""):
+        """Запросы к ASGI-приложению; возвращает [(статус, тело)]."""
+        async def request(path):
+            # Тело приходит двумя сообщениями, как у больших запросов.
+            messages = [
+                {"type": "http.request", "body": body[1:]},
+                {"type": "http.request", "body": body[:1],
+                 "more_body": True},
+            ]
+            response = {"body": b""}
+
+            async def receive():
+                return messages.pop()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                else:
+                    response["body"] += message.get("body", b"")
+
+            await application({
+                "type": "http", "http_version": "1.1", "method": method,
+                "scheme": "http", "path": path, "query_string": b"q=1",
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"content-type", b"text/plain"),
+                    (b"x-trace", b"a"), (b"x-trace", b"b"),
+                ],
+                "server": ("testserver", 80),
+            }, receive, send)
+            return response["status"], response["body"]
+
+        async def serve():
+            return await asyncio.gather(*map(request, paths))
+
+        return asyncio.run(serve())
+
+    def test_serves_django_pages(self):
+        [(status, body)] = self.serve(
+            ThreadedWsgiToAsgi(WSGIHandler()), [reverse("about:author")]
+        )
+        self.assertEqual(status, 200)
+        self.assertIn(b"<html", body)
+
+    def test_requests_run_concurrently_and_responses_are_closed(self):
+        threads, closed = set(), []
+
+        class Body(list):
+            def close(self):
+                closed.append(threading.get_ident())
+
+        def application(environ, start_response):
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return Body([b"ok"])
+
+        started = time.perf_counter()
+        responses = self.serve(ThreadedWsgiToAsgi(application), ["/"] * 4)
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(responses, [(200, b"ok")] * 4)
+        self.assertEqual(len(threads), 4)
+        self.assertEqual(set(closed), threads)
+
+    def test_passes_request_to_wsgi(self):
+        def application(environ, start_response):
+            start_response("201 Created", [("Content-Type", "text/plain")])
+            return [
+                "|".join([
+                    environ["REQUEST_METHOD"], environ["PATH_INFO"],
+                    environ["QUERY_STRING"], environ["CONTENT_TYPE"],
+                    environ["HTTP_X_TRACE"], environ["SERVER_NAME"],
+                ]).encode(),
+                environ["wsgi.input"].read(),
+            ]
+
+        [response] = self.serve(
+            ThreadedWsgiToAsgi(application), ["/path/"], "POST", b"data"
+        )
+        self.assertEqual(
+            response, (201, b"POST|/path/|q=1|text/plain|a,b|testserverdata")
+        )
+
+    def test_acknowledges_lifespan(self):
+        messages = [
+            {"type": "lifespan.shutdown"}, {"type": "lifespan.startup"},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(ThreadedWsgiToAsgi(WSGIHandler())(
+            {"type": "lifespan"}, receive, send
+        ))
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+
+
+class ServerBenchmarkTest(TransactionTestCase):
+    # Запросы идут из других потоков со своими соединениями: данные
+    # должны быть закоммичены, поэтому не TestCase.
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_measures_every_server(self):
+        call_command(
+            "seed_data", users=3, groups=2, posts=20, comments=10,
+            workers=1, stdout=StringIO(),
+        )
+        results = run_server_benchmarks(requests=8, concurrency=2)
+        self.assertEqual(set(results), set(SERVERS))
+        for name, measured in results.items():
+            with self.subTest(server=name):
+                self.assertGreater(measured["requests_per_s"], 0)
+
+
+@override_settings(
+    DATABASE_REPLICAS={"replica1": 3, "replica2": 1},
+    POSTS_PAGE_CACHE_TIMEOUT=0,
+)
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        replicas._down_until.clear()
+        replicas.start_request()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for alias in ("replica1", "replica2"):
+            self.add_replica(alias)
+        self.author = User.objects.create_user("auth")
+
+    def add_replica(self, alias):
+        # Реплики - SQLite-файлы только для чтения, как в примере из
+        # settings; подключаются на время теста.
+        path = os.path.join(self.directory, f"{alias}.sqlite3")
+        connections.databases[alias] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"file:{path}?mode=ro",
+            "OPTIONS": {"uri": True},
+        }
+
+        def remove():
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        self.addCleanup(remove)
+
+    def sync(self):
+        for alias in ("replica1", "replica2"):
+            connections[alias].close()
+            copy_database(alias)
+
+    def test_reads_replica_until_user_writes(self):
+        Post.objects.create(author=self.author, text="старый пост")
+        self.sync()
+        Post.objects.create(author=self.author, text="новый пост")
+
+        # Реплики отстают: аноним нового поста ещё не видит.
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "старый пост")
+        self.assertNotContains(response, "новый пост")
+
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse("posts:create_post"), {"text": "свежий пост"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.DATABASE_STICKY_COOKIE, response.cookies)
+        # Автор сразу видит и свой пост, и всё остальное из default.
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "свежий пост")
+        self.assertContains(response, "новый пост")
+
+        self.client.cookies.pop(settings.DATABASE_STICKY_COOKIE)
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "свежий пост")
+
+    def test_weighted_choice(self):
+        self.sync()
+        random.seed(0)
+        with override_settings(
+            DATABASE_REPLICAS={"replica1": 3, "replica2": 1, "default": 0}
+        ):
+            chosen = [replicas.choose_replica() for _ in range(400)]
+        self.assertNotIn("default", chosen)
+        self.assertGreater(
+            chosen.count("replica1"), 2 * chosen.count("replica2")
+        )
+        self.assertGreater(chosen.count("replica2"), 0)
+
+    def test_falls_back_when_replicas_are_down(self):
+        # Файлов реплик ещё нет: подключение к ним не удаётся.
+        with self.assertLogs("core.replicas", "WARNING"):
+            self.assertEqual(replicas.choose_replica(), DEFAULT_DB_ALIAS)
+        self.sync()
+        # Упавшая реплика пропускается до истечения паузы...
+        self.assertEqual(replicas.choose_replica(), DEFAULT_DB_ALIAS)
+        # ...а после неё снова используется.
+        with override_settings(DATABASE_REPLICA_RETRY_SECONDS=0):
+            replicas._down_until.clear()
+            self.assertIn(replicas.choose_replica(), ("replica1", "replica2"))
+
+    def test_writes_and_transactions_read_default(self):
+        self.sync()
+        router = replicas.ReplicaRouter()
+        self.assertIn(router.db_for_read(Post), ("replica1", "replica2"))
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        # Модели вне DATABASE_REPLICA_APPS всегда читаются из default.
+        self.assertIsNone(router.db_for_read(User))
+        replicas.start_request()
+        Post.objects.create(author=self.author, text="пост")
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_cached_pages_are_read_from_default(self):
+        Post.objects.create(author=self.author, text="старый пост")
+        self.sync()
+        Post.objects.create(author=self.author, text="новый пост")
+        with override_settings(POSTS_PAGE_CACHE_TIMEOUT=60):
+            # Страница попадёт в кэш под новым поколением ленты:
+            # отстающая реплика оставила бы в нём старую страницу.
+            for _ in range(2):
+                response = self.client.get(reverse("posts:index"))
+                self.assertContains(response, "новый пост")
+
+    def test_failed_replica_query_retried_on_default(self):
+        Post.objects.create(author=self.author, text="пост")
+        # Реплики подключаются, но таблиц в них нет: падает сам запрос.
+        for alias in ("replica1", "replica2"):
+            path = os.path.join(self.directory, f"{alias}.sqlite3")
+            with closing(sqlite3.connect(path)) as replica:
+                replica.execute("PRAGMA journal_mode = wal")
+                replica.execute("CREATE TABLE placeholder (id INTEGER)")
+        with self.assertLogs("core.replicas", "WARNING"):
+            response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "пост")
+        [failed] = replicas._down_until
+        self.assertIn(failed, ("replica1", "replica2"))
+        self.assertEqual(replicas.current_replica(), None)
+
+    def test_streaming_response_keeps_request_state(self):
+        Post.objects.create(author=self.author, text="старый пост")
+        self.sync()
+        Post.objects.create(author=self.author, text="новый пост")
+        staff = User.objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+        self.client.cookies[settings.DATABASE_STICKY_COOKIE] = str(
+            int(time.time() + 60)
+        )
+        response = self.client.get(
+            reverse("api:export", kwargs={"table": "posts"})
+        )
+        # Выгрузка читает базу, пока отдаётся, и всё это время - из
+        # default, как и требует cookie.
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("новый пост", content)
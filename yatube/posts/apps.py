@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = "posts"
+
+    def ready(self):
+        from core.metrics import register_collector
+
+        from . import checks, signals  # noqa: F401
+        from .cache import page_cache_metrics
+        from .search import install_search_index
+
+        post_migrate.connect(install_search_index, sender=self)
+        register_collector(page_cache_metrics)
@@ -0,0 +1,301 @@
+"""Замеры представлений для benchmark_views и benchmark_templates.
+
+Каждое представление прогоняется через тестовый клиент на заполненной
+seed_data базе: время ответа (p50/p95), число SQL-запросов и пик
+выделенной памяти. Результаты сравниваются с бюджетами из JSON-файла.
+Отдельно меряется рендеринг шаблонов страниц при разных загрузчиках.
+Пропускная способность под WSGI и ASGI меряется в core.benchmarks.
+"""
+import copy
+import math
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases,
+    setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from core.template_loaders import precompile_templates
+
+from .counters import change_author_counter
+from .models import Comment, Follow, Group, Post, TimelineEntry
+from .timelines import timeline_page
+from .views import SELECT_LIMIT
+
+User = get_user_model()
+
+# Размеры наборов данных: аргументы seed_data.
+DATASETS = {
+    "small": {"users": 20, "groups": 5, "posts": 500, "comments": 1000},
+    "medium": {
+        "users": 500, "groups": 50, "posts": 50000, "comments": 100000,
+    },
+    "large": {
+        "users": 5000, "groups": 1000, "posts": 500000, "comments": 500000,
+    },
+}
+
+METRICS = ("p50_ms", "p95_ms", "queries", "memory_kb")
+
+_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+# Режимы загрузки шаблонов: (загрузчики, компилировать ли заранее).
+TEMPLATE_MODES = {
+    # Как было: каждый рендеринг читает и разбирает файлы заново.
+    "uncached": (_LOADERS, False),
+    # Разработка: кэш с проверкой времени изменения файлов.
+    "reloading": (
+        [("core.template_loaders.ReloadingLoader", _LOADERS)], False
+    ),
+    # Продакшен: кэш, заполненный при старте.
+    "precompiled": (
+        [("django.template.loaders.cached.Loader", _LOADERS)], True
+    ),
+}
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * share) - 1, 0)]
+
+
+def view_requests():
+    """Запросы к представлениям: (имя, метод, адрес, данные, статус).
+
+    Берутся самые тяжёлые страницы набора: самая большая группа, самый
+    плодовитый автор и самый обсуждаемый пост."""
+    group = Group.objects.order_by("-post_count").first()
+    author = User.objects.order_by("-post_stats__post_count").first()
+    post = Post.objects.order_by("-comment_count").first()
+    return author, [
+        ("index", "get", reverse("posts:index"), None, 200),
+        (
+            "group_posts", "get",
+            reverse("posts:group_list", kwargs={"slug": group.slug}),
+            None, 200,
+        ),
+        (
+            "profile", "get",
+            reverse("posts:profile", kwargs={"username": author.username}),
+            None, 200,
+        ),
+        (
+            "post_detail", "get",
+            reverse("posts:post_detail", kwargs={"post_id": post.pk}),
+            None, 200,
+        ),
+        (
+            "create_post", "post", reverse("posts:create_post"),
+            {"text": "Пост из замера", "group": group.pk}, 302,
+        ),
+        (
+            "add_comment", "post",
+            reverse("posts:add_comment", kwargs={"post_id": post.pk}),
+            {"text": "Комментарий из замера"}, 302,
+        ),
+    ]
+
+
+def run_benchmarks(repeat=20):
+    """Замеряет все представления и возвращает {имя: {метрика: значение}}.
+
+    Память меряется отдельным запросом: tracemalloc заметно замедляет
+    код и исказил бы время."""
+    author, requests = view_requests()
+    client = Client()
+    client.force_login(author)
+    results = {}
+    for name, method, url, data, status in requests:
+        send = getattr(client, method)
+
+        def request():
+            response = send(url, data)
+            if response.status_code != status:
+                raise AssertionError(
+                    f"{name}: ответ {response.status_code} вместо {status}"
+                )
+
+        request()
+        timings, queries = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results[name] = {
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "queries": max(queries),
+            "memory_kb": round(peak / 1024),
+        }
+    return results
+
+
+def _templates_with(loaders):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for backend in templates:
+        backend["APP_DIRS"] = False
+        backend.setdefault("OPTIONS", {})["loaders"] = loaders
+    return templates
+
+
+def run_template_benchmarks(repeat=50):
+    """Время рендеринга шаблона каждой GET-страницы в каждом режиме
+    TEMPLATE_MODES: {страница: {режим: p50 в мс}}.
+
+    Контекст страницы берётся из настоящего ответа представления, так
+    что меряются только загрузка и рендеринг шаблонов."""
+    author, requests = view_requests()
+    client = Client()
+    client.force_login(author)
+    pages = []
+    for name, method, url, data, status in requests:
+        if method != "get":
+            continue
+        response = client.get(url)
+        pages.append((
+            name, response.templates[0].name,
+            response.context[0].flatten(), response.wsgi_request,
+        ))
+
+    results = {name: {} for name, *_ in pages}
+    for mode, (loaders, precompile) in TEMPLATE_MODES.items():
+        with override_settings(TEMPLATES=_templates_with(loaders)):
+            if precompile:
+                precompile_templates()
+            for name, template_name, context, request in pages:
+                render_to_string(template_name, context, request)
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    render_to_string(template_name, context, request)
+                    timings.append((time.perf_counter() - started) * 1000)
+                results[name][mode] = round(statistics.median(timings), 2)
+    return results
+
+
+@contextmanager
+def test_database():
+    """Чистая тестовая база на время блока."""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        cache.clear()
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+        cache.clear()
+
+
+@contextmanager
+def seeded_database(dataset, seed=0):
+    """Чистая тестовая база, заполненная seed_data набором `dataset`.
+
+    Страничный кэш выключен: иначе замер покажет только попадания
+    в кэш, а не работу представления."""
+    with test_database():
+        call_command(
+            "seed_data", seed=seed, stdout=StringIO(), **DATASETS[dataset]
+        )
+        with override_settings(POSTS_PAGE_CACHE_TIMEOUT=0):
+            yield
+
+
+def _timed(action, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def run_fanout_benchmarks(follower_counts, repeat=10):
+    """Цена публикации и чтения ленты подписок для автора с N
+    подписчиками: {N: {метрика: значение}}.
+
+    publish_ms - создание поста с раскладкой по лентам, publish_merged_ms -
+    тот же автор как популярный (без раскладки), read_ms и
+    read_merged_ms - страница ленты подписчика в обоих случаях."""
+    results = {}
+    for count in follower_counts:
+        author = User.objects.create_user(f"fanout_author_{count}")
+        User.objects.bulk_create(
+            User(username=f"fanout_{count}_{number}")
+            for number in range(count)
+        )
+        followers = User.objects.filter(
+            username__startswith=f"fanout_{count}_"
+        )
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author=author)
+            for user_id in followers.values_list("pk", flat=True)
+        )
+        change_author_counter(author.pk, "follower_count", count)
+        reader = followers.first()
+
+        def publish():
+            Post.objects.create(author=author, text="Пост из замера")
+
+        def read():
+            list(timeline_page(reader, SELECT_LIMIT))
+
+        with override_settings(POSTS_FANOUT_MAX_FOLLOWERS=count + 1):
+            metrics = {"publish_ms": _timed(publish, repeat)}
+            metrics["read_ms"] = _timed(read, repeat)
+            with CaptureQueriesContext(connection) as captured:
+                read()
+            metrics["read_queries"] = len(captured)
+        with override_settings(POSTS_FANOUT_MAX_FOLLOWERS=count):
+            metrics["publish_merged_ms"] = _timed(publish, repeat)
+            metrics["read_merged_ms"] = _timed(read, repeat)
+        metrics["entries_per_post"] = TimelineEntry.objects.filter(
+            post=Post.objects.filter(author=author).earliest("pub_date")
+        ).count()
+        results[count] = metrics
+    return results
+
+
+def check_budgets(results, budgets):
+    """Список превышений: (представление, метрика, значение, бюджет)."""
+    return [
+        (name, metric, metrics[metric], budgets[name][metric])
+        for name, metrics in results.items()
+        for metric in METRICS
+        if metric in budgets.get(name, {})
+        and metrics[metric] > budgets[name][metric]
+    ]
+
+
+def dataset_summary():
+    return {
+        "users": User.objects.count(),
+        "posts": Post.objects.count(),
+        "groups": Group.objects.count(),
+        "comments": Comment.objects.count(),
+    }
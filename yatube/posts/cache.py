@@ -0,0 +1,177 @@
+import hashlib
+import threading
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date
+
+from core.replicas import primary_reads
+
+# Заголовки, которые сохраняются в кэше вместе с телом страницы.
+CACHED_HEADERS = ("ETag", "Last-Modified", "Vary")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _count(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+def page_cache_stats():
+    """Счётчики попаданий и промахов кэша страниц в этом процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def page_cache_metrics():
+    """Счётчики кэша страниц для core.metrics в формате Prometheus."""
+    lines = [
+        "# HELP yatube_page_cache_events_total События кэша страниц.",
+        "# TYPE yatube_page_cache_events_total counter",
+    ]
+    for event, count in sorted(page_cache_stats().items()):
+        lines.append(
+            f'yatube_page_cache_events_total{{event="{event}"}} {count}'
+        )
+    return lines
+
+
+def feed_key(kind, value=""):
+    """Ключ поколения ленты: ("index",), ("group", slug),
+    ("profile", username), ("post", id), а также данных, которые
+    выводятся на чужих страницах: ("author", id) - имя, адрес и число
+    постов автора, ("group-info", id) - название и адрес группы."""
+    return f"posts:feed:{kind}:{value}"
+
+
+def post_card_key(post):
+    """Ключ фрагмента includes/post_card.html: те же значения, что в его
+    теге {% cache %}."""
+    return make_template_fragment_key(
+        "post_card",
+        [
+            post.pk, post.updated.isoformat(), post.author.username,
+            post.author.get_full_name(),
+        ],
+    )
+
+
+def _generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid4().hex
+        if not cache.add(key, generation, None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def _generations(keys):
+    """Поколения ключей `keys` одним get_many; недостающие создаются."""
+    generations = cache.get_many(keys)
+    for key in set(keys) - set(generations):
+        generations[key] = _generation(key)
+    return generations
+
+
+def page_depends_on(request, *feeds):
+    """Отмечает, что страница показывает данные лент `feeds`, например
+    ("author", id) для каждого автора в карточках. Закэшированная страница
+    запоминает их поколения и не отдаётся, когда любое из них сброшено:
+    переименование автора или группы не требует перебирать страницы, на
+    которых они выводятся."""
+    request.__dict__.setdefault("_page_feeds", set()).update(feeds)
+
+
+def _current(generations):
+    """Не сброшено ли ни одно из сохранённых поколений {ключ: поколение}."""
+    return not generations or cache.get_many(list(generations)) == generations
+
+
+def invalidate_feeds(*feeds):
+    """Сбрасывает кэш страниц лент: после удаления ключа поколения
+    все закэшированные страницы этих лент становятся недостижимы."""
+    keys = {feed_key(*feed) for feed in feeds}
+    if keys:
+        cache.delete_many(list(keys))
+        _count("invalidations", len(keys))
+
+
+def cache_anonymous_page(get_feed):
+    """Кэширует GET-ответы анонимным пользователям.
+
+    `get_feed(**view_kwargs)` возвращает ленту, к которой относится
+    страница; ключ страницы - поколение ленты плюс полный путь с
+    параметрами, поэтому разные страницы и курсоры кэшируются отдельно.
+    Авторизованные пользователи всегда получают свежий ответ со своей
+    шапкой.
+
+    Вместе со страницей хранятся её валидаторы (posts.conditional), так
+    что на попадание в кэш с совпавшим ETag ответ 304 уходит без
+    единого запроса к базе, и поколения лент из page_depends_on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+                or not settings.POSTS_PAGE_CACHE_TIMEOUT
+            ):
+                return view(request, *args, **kwargs)
+
+            generation = _generation(feed_key(*get_feed(**kwargs)))
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f"posts:page:{view.__name__}:{generation}:{path}"
+            cached = cache.get(key)
+            if cached is not None and _current(cached[3]):
+                _count("hits")
+                content, content_type, headers, _ = cached
+                response = HttpResponse(content, content_type=content_type)
+                for header, value in headers.items():
+                    response[header] = value
+                if "ETag" not in headers:
+                    return response
+                last_modified = headers.get("Last-Modified")
+                return get_conditional_response(
+                    request,
+                    etag=headers["ETag"],
+                    last_modified=(
+                        parse_http_date(last_modified)
+                        if last_modified else None
+                    ),
+                    response=response,
+                )
+
+            _count("misses")
+            # Страница попадёт в общий кэш: читаем её из default (см.
+            # core.replicas.primary_reads).
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                headers = {
+                    header: response[header]
+                    for header in CACHED_HEADERS
+                    if response.has_header(header)
+                }
+                generations = _generations([
+                    feed_key(*feed)
+                    for feed in getattr(request, "_page_feeds", ())
+                ])
+                cache.set(
+                    key,
+                    (
+                        response.content, response["Content-Type"], headers,
+                        generations,
+                    ),
+                    settings.POSTS_PAGE_CACHE_TIMEOUT,
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+@register(deploy=True)
+def check_page_cache_is_shared(app_configs, **kwargs):
+    """Кэш страниц сбрасывается сигналами только в процессе, сохранившем
+    модель; при кэше в памяти процесса остальные воркеры отдавали бы
+    устаревшие страницы."""
+    if not settings.POSTS_PAGE_CACHE_TIMEOUT:
+        return []
+    if isinstance(caches["default"], (LocMemCache, DummyCache)):
+        return [
+            Error(
+                "Кэш страниц включён, но кэш default хранится в памяти "
+                "процесса.",
+                hint="Настройте общий кэш (Memcached, Redis) в CACHES или "
+                "отключите кэш страниц: POSTS_PAGE_CACHE_TIMEOUT = 0.",
+                id="posts.E001",
+            )
+        ]
+    return []
@@ -0,0 +1,166 @@
+"""Условные GET-запросы: ETag и Last-Modified для страниц постов.
+
+Валидатор считается по объекту страницы (посту, автору или группе),
+который загружается одним запросом вместе с датой последнего изменения
+из индекса. Если клиент прислал совпадающий валидатор, представление не
+вызывается и шаблон не рендерится; иначе представление берёт тот же
+объект через `get_page_object_or_404`, и лишнего запроса нет.
+
+В состояние входят и счётчики: удаление поста или комментария не
+двигает MAX(updated), но меняет их. Карточки выводят чужие данные -
+группы постов автора и авторов постов группы; их изменения учитываются
+по последней правке любой группы (Group.updated) и последнему
+переименованию любого автора (AuthorStats.profile_updated): обе даты
+читаются по индексу или из маленькой таблицы.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import AuthorStats, Comment, Group, Post, User
+
+
+def _latest(queryset, field):
+    return Subquery(queryset.order_by(f"-{field}").values(field)[:1])
+
+
+def groups_changed():
+    """Подзапрос: когда последний раз менялась любая группа."""
+    return _latest(Group.objects.all(), "updated")
+
+
+def authors_changed():
+    """Подзапрос: когда любой автор последний раз менял имя или username."""
+    return _latest(
+        AuthorStats.objects.filter(profile_updated__isnull=False),
+        "profile_updated",
+    )
+
+
+def load_post(post_id):
+    return (
+        Post.objects.select_related("author__post_stats", "group")
+        .annotate(
+            last_comment=_latest(
+                Comment.objects.filter(post=OuterRef("pk")), "created"
+            )
+        )
+        .filter(pk=post_id)
+        .first()
+    )
+
+
+def post_state(post):
+    stats = getattr(post.author, "post_stats", None)
+    return (
+        post.updated, post.last_comment, post.comment_count,
+        post.group.title if post.group else None,
+        post.group.slug if post.group else None,
+        post.author.get_full_name(), post.author.username,
+        stats.post_count if stats else 0,
+    )
+
+
+def load_author(username):
+    return (
+        User.objects.select_related("post_stats")
+        .annotate(
+            last_post=_latest(
+                Post.objects.filter(author=OuterRef("pk")), "updated"
+            ),
+            groups_changed=groups_changed(),
+        )
+        .filter(username__exact=username)
+        .first()
+    )
+
+
+def author_state(author):
+    # Число подписчиков меняется при подписке и отписке - вместе с
+    # кнопкой на странице.
+    stats = getattr(author, "post_stats", None)
+    return (
+        author.last_post, stats.post_count if stats else 0,
+        stats.follower_count if stats else 0, author.get_full_name(),
+        author.groups_changed,
+    )
+
+
+def load_group(slug):
+    return (
+        Group.objects.annotate(
+            last_post=_latest(
+                Post.objects.filter(group=OuterRef("pk")), "updated"
+            ),
+            authors_changed=authors_changed(),
+        )
+        .filter(slug=slug)
+        .first()
+    )
+
+
+def group_state(group):
+    return (
+        group.last_post, group.post_count, group.title, group.description,
+        group.authors_changed,
+    )
+
+
+def get_page_object_or_404(request, load, **kwargs):
+    """Объект страницы, загруженный `load(**kwargs)`; в пределах запроса
+    загружается один раз - и для валидатора, и для представления."""
+    objects = request.__dict__.setdefault("_page_objects", {})
+    key = (load, tuple(sorted(kwargs.items())))
+    if key not in objects:
+        objects[key] = load(**kwargs)
+    if objects[key] is None:
+        raise Http404
+    return objects[key]
+
+
+def conditional_page(load, get_state):
+    """Отвечает 304 Not Modified, если страница не менялась.
+
+    `get_state(obj)` возвращает кортеж состояния объекта страницы; для
+    Last-Modified берётся наибольшая дата в нём. Авторизованный
+    пользователь видит свою шапку, поэтому его id входит в ETag, а ответ
+    помечается Vary: Cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            state = get_state(get_page_object_or_404(request, load, **kwargs))
+
+            digest = hashlib.md5(
+                repr((request.user.pk, state)).encode()
+            ).hexdigest()
+            etag = "W/" + quote_etag(digest)
+            dates = [
+                value for value in state if hasattr(value, "utctimetuple")
+            ]
+            last_modified = (
+                timegm(max(dates).utctimetuple()) if dates else None
+            )
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.setdefault("ETag", etag)
+                if last_modified:
+                    response.setdefault(
+                        "Last-Modified", http_date(last_modified)
+                    )
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
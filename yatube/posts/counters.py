@@ -0,0 +1,83 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно сдвигает счётчик `field` у записи `pk` на `delta`."""
+    if pk is None or not delta:
+        return 0
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # PositiveIntegerField не переживёт ухода в минус, если счётчик
+        # уже разошёлся с данными, - его поправит rebuild_counters.
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_author_counter(author_id, field, delta):
+    """Сдвигает счётчик автора, при необходимости создавая AuthorStats."""
+    from .models import AuthorStats
+
+    if change_counter(AuthorStats, author_id, field, delta):
+        return
+    if delta > 0:
+        stats, created = AuthorStats.objects.get_or_create(
+            author_id=author_id, defaults={field: delta}
+        )
+        if not created:
+            change_counter(AuthorStats, author_id, field, delta)
+
+
+def change_author_post_count(author_id, delta):
+    change_author_counter(author_id, "post_count", delta)
+
+
+def _count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def rebuild_counters(apps=global_apps):
+    """Пересчитывает все счётчики по фактическим данным.
+
+    Принимает реестр приложений, чтобы работать и из миграции.
+    """
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    try:
+        Follow = apps.get_model("posts", "Follow")
+    except LookupError:
+        # Миграция 0007 работает со схемой, где подписок ещё нет.
+        Follow = None
+
+    Group.objects.update(post_count=_count_subquery(Post, "group"))
+    Post.objects.update(comment_count=_count_subquery(Comment, "post"))
+
+    known = AuthorStats.objects.values("author_id")
+    authors = set()
+    for model in (Post, Follow):
+        if model is not None:
+            authors.update(
+                model.objects.order_by()
+                .exclude(author_id__in=known)
+                .values_list("author_id", flat=True)
+                .distinct()
+            )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=author_id) for author_id in authors
+    )
+    counts = {"post_count": _count_subquery(Post, "author")}
+    if Follow is not None:
+        counts["follower_count"] = _count_subquery(Follow, "author")
+    AuthorStats.objects.update(**counts)
@@ -0,0 +1,255 @@
+"""Массовая загрузка постов и комментариев из CSV и JSON Lines.
+
+Файл читается потоком и обрабатывается пачками: пачка проверяется
+целиком (авторы и группы - по словарям в памяти, посты комментариев и
+занятые id - одним запросом на пачку), а годные строки пишутся одним
+executemany в своей транзакции. Формат строк совпадает с выгрузкой
+posts.exports, лишние колонки не мешают.
+
+Пишется мимо моделей, как и в seed_data: bulk_create подставил бы
+текущее время в pub_date и updated (auto_now_add/auto_now), а на
+миллионах строк сборка экземпляров моделей дороже самой вставки.
+"""
+import csv
+import json
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import DateTimeField
+from django.utils import timezone
+
+from .exports import parse_since
+from .models import Comment, Group, Post
+
+User = get_user_model()
+
+# Строк в одной пачке и одной транзакции.
+BATCH_SIZE = 5000
+
+# model - куда пишутся строки, columns - колонки вставки без id,
+# prepare - проверка пачки (см. prepare_posts).
+Import = namedtuple("Import", "model columns prepare")
+
+
+def insert_rows(model, columns, rows):
+    """Вставляет кортежи `rows` в колонки `columns` таблицы модели одним
+    executemany. Даты приводятся к формату базы."""
+    fields = [model._meta.get_field(column) for column in columns]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    dates = [
+        position for position, field in enumerate(fields)
+        if isinstance(field, DateTimeField)
+    ]
+    adapt = connection.ops.adapt_datetimefield_value
+    for position in dates:
+        rows = [
+            row[:position] + (adapt(row[position]),) + row[position + 1:]
+            for row in rows
+        ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def file_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(lines, input_format):
+    """Строки файла словарями: (номер строки данных, словарь). Строка
+    JSON Lines, которая не разбирается, приходит как None."""
+    if input_format == "csv":
+        yield from enumerate(csv.DictReader(lines), 1)
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class Lookups:
+    """Словари username -> id и slug -> id на время загрузки: пользователей
+    и групп на порядки меньше, чем постов, а запрос на каждую строку
+    стоил бы дороже самой вставки."""
+
+    def __init__(self):
+        self.authors = dict(User.objects.values_list("username", "pk"))
+        self.groups = dict(Group.objects.values_list("slug", "pk"))
+
+
+def _text(row):
+    text = str(row.get("text") or "").strip()
+    if not text:
+        raise ValueError("пустой текст")
+    return text
+
+
+def _moment(row, name, default):
+    value = row.get(name)
+    if not value:
+        return default
+    return parse_since(str(value))
+
+
+def _author(row, lookups):
+    username = str(row.get("author") or "")
+    if username not in lookups.authors:
+        raise ValueError(f"неизвестный автор {username!r}")
+    return lookups.authors[username]
+
+
+def _id(row):
+    value = row.get("id")
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    if number < 1:
+        raise ValueError(f"неверный id {value!r}")
+    return number
+
+
+def existing_ids(model, ids):
+    """Какие из `ids` уже есть в таблице. Запросы порциями: SQLite
+    ограничивает число параметров запроса."""
+    ids = sorted(set(ids))
+    step = connection.features.max_query_params or len(ids) or 1
+    found = set()
+    for start in range(0, len(ids), step):
+        found.update(
+            model.objects.filter(
+                pk__in=ids[start:start + step]
+            ).values_list("pk", flat=True)
+        )
+    return found
+
+
+def _validate(rows, check):
+    """Применяет `check` к каждой строке: годные значения и ошибки
+    [(номер, причина)]."""
+    values, errors = [], []
+    for number, row in rows:
+        if row is None:
+            errors.append((number, "строка не разбирается"))
+            continue
+        try:
+            values.append((number, check(row)))
+        except ValueError as exc:
+            errors.append((number, str(exc)))
+    return values, errors
+
+
+def _drop_taken(model, values, errors):
+    """Убирает строки с уже занятыми id, в том числе повторы внутри
+    пачки: повторная загрузка того же файла после сбоя не создаёт
+    дублей."""
+    taken = existing_ids(
+        model, [row[0] for _, row in values if row[0] is not None]
+    )
+    kept = []
+    for number, row in values:
+        if row[0] in taken:
+            errors.append((number, f"id {row[0]} уже занят"))
+            continue
+        if row[0] is not None:
+            taken.add(row[0])
+        kept.append(row)
+    return kept
+
+
+def prepare_posts(rows, lookups):
+    """Проверяет пачку постов. Возвращает кортежи (id, *POST_COLUMNS) и
+    ошибки [(номер, причина)]."""
+    now = timezone.now()
+
+    def check(row):
+        slug = str(row.get("group") or "")
+        if slug and slug not in lookups.groups:
+            raise ValueError(f"неизвестная группа {slug!r}")
+        pub_date = _moment(row, "pub_date", now)
+        return (
+            _id(row), _text(row), pub_date,
+            _moment(row, "updated", pub_date), _author(row, lookups),
+            lookups.groups.get(slug), str(row.get("image") or ""), 0,
+        )
+
+    values, errors = _validate(rows, check)
+    return _drop_taken(Post, values, errors), errors
+
+
+def prepare_comments(rows, lookups):
+    """Проверяет пачку комментариев: пост должен существовать. Возвращает
+    кортежи (id, *COMMENT_COLUMNS) и ошибки."""
+    now = timezone.now()
+
+    def check(row):
+        try:
+            post_id = int(row.get("post_id") or 0)
+        except (TypeError, ValueError):
+            post_id = 0
+        return (
+            _id(row), _text(row), _moment(row, "created", now), post_id,
+            _author(row, lookups),
+        )
+
+    values, errors = _validate(rows, check)
+    posts = existing_ids(Post, [row[3] for _, row in values])
+    existing = []
+    for number, row in values:
+        if row[3] in posts:
+            existing.append((number, row))
+        else:
+            errors.append((number, f"нет поста {row[3]}"))
+    return _drop_taken(Comment, existing, errors), errors
+
+
+IMPORTS = {
+    "posts": Import(
+        Post,
+        (
+            "text", "pub_date", "updated", "author_id", "group_id", "image",
+            "comment_count",
+        ),
+        prepare_posts,
+    ),
+    "comments": Import(
+        Comment,
+        ("text", "created", "post_id", "author_id"),
+        prepare_comments,
+    ),
+}
+
+
+def write_batch(name, rows):
+    """Пишет проверенные строки: с id из файла и без него - отдельными
+    вставками, чтобы база сама выдала id вторым."""
+    spec = IMPORTS[name]
+    with_ids = [row for row in rows if row[0] is not None]
+    without_ids = [row[1:] for row in rows if row[0] is None]
+    if with_ids:
+        insert_rows(spec.model, ("id",) + spec.columns, with_ids)
+    if without_ids:
+        insert_rows(spec.model, spec.columns, without_ids)
+
+
+def reset_sequences(name):
+    """Сдвигает счётчик id таблицы за вставленные id из файла (нужно,
+    например, PostgreSQL; SQLite берёт следующий id из данных)."""
+    model = IMPORTS[name].model
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
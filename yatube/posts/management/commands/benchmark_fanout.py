@@ -0,0 +1,59 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmarks import run_fanout_benchmarks, test_database
+
+COLUMNS = (
+    ("publish_ms", "публикация"),
+    ("publish_merged_ms", "без раскладки"),
+    ("read_ms", "чтение"),
+    ("read_merged_ms", "чтение слиянием"),
+    ("read_queries", "запросов"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет цену раскладки поста по лентам подписчиков (fan-out on "
+        "write) и чтения ленты подписок для авторов с разным числом "
+        "подписчиков, в том числе для популярных авторов, чьи посты "
+        "подмешиваются при чтении."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--followers", type=int, nargs="+", default=[100, 1000, 10000],
+            help="Числа подписчиков автора.",
+        )
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--output", help="Куда записать результаты в формате JSON."
+        )
+
+    def handle(self, *args, **options):
+        with test_database():
+            measured = run_fanout_benchmarks(
+                options["followers"], options["repeat"]
+            )
+
+        self.stdout.write(
+            f"{'подписчиков':>12}"
+            + "".join(f" {title:>16}" for _, title in COLUMNS)
+        )
+        for count, metrics in measured.items():
+            self.stdout.write(
+                f"{count:>12}"
+                + "".join(f" {metrics[name]:>16}" for name, _ in COLUMNS)
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(
+                    {
+                        "python": platform.python_version(),
+                        "repeat": options["repeat"],
+                        "followers": measured,
+                    },
+                    output, ensure_ascii=False, indent=2,
+                )
@@ -0,0 +1,55 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmarks import (
+    DATASETS, TEMPLATE_MODES, run_template_benchmarks, seeded_database,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время рендеринга шаблонов index, group_posts, profile "
+        "и post_detail без кэша шаблонов, с кэшем для разработки и с "
+        "шаблонами, скомпилированными при старте."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dataset", choices=list(DATASETS), default="small",
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output", help="Куда записать результаты в формате JSON."
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Набор {options['dataset']}: заполнение базы...")
+        with seeded_database(options["dataset"], options["seed"]):
+            measured = run_template_benchmarks(options["repeat"])
+
+        self.stdout.write(
+            f"{'p50, мс':>12}"
+            + "".join(f" {mode:>12}" for mode in TEMPLATE_MODES)
+            + f" {'ускорение':>10}"
+        )
+        for name, modes in measured.items():
+            speedup = modes["uncached"] / modes["precompiled"]
+            self.stdout.write(
+                f"{name:>12}"
+                + "".join(f" {modes[mode]:>12}" for mode in TEMPLATE_MODES)
+                + f" {speedup:>9.1f}x"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(
+                    {
+                        "python": platform.python_version(),
+                        "dataset": options["dataset"],
+                        "repeat": options["repeat"],
+                        "views": measured,
+                    },
+                    output, ensure_ascii=False, indent=2,
+                )
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from posts.models import Post
+from posts.thumbnails import prefetch_thumbnails, thumbnail_name
+
+GEOMETRY = "100x100"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время поиска миниатюр для страницы ленты: по одной "
+        "картинке, как тег {% thumbnail %}, и одним пакетным запросом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size", type=int, default=10,
+            help="Постов с картинками на странице.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=50,
+            help="Сколько раз повторить каждый замер.",
+        )
+        parser.add_argument(
+            "--warm", action="store_true",
+            help="Не сбрасывать кэш перед замером (по умолчанию - холодный).",
+        )
+
+    def handle(self, *args, **options):
+        posts = list(
+            Post.objects.exclude(image="").order_by("-pub_date")[
+                :options["page_size"]
+            ]
+        )
+        if not posts:
+            raise CommandError(
+                "Нет постов с картинками: загрузите их или запустите seed."
+            )
+        thumbnail_options = dict(settings.POSTS_THUMBNAILS)[GEOMETRY]
+        for post in posts:
+            get_thumbnail(post.image, GEOMETRY, **thumbnail_options)
+        keys = [
+            add_prefix(
+                ImageFile(
+                    thumbnail_name(post.image, GEOMETRY, thumbnail_options),
+                    default.storage,
+                ).key
+            )
+            for post in posts
+        ]
+
+        def one_by_one():
+            for post in posts:
+                get_thumbnail(post.image, GEOMETRY, **thumbnail_options)
+
+        def batched():
+            prefetch_thumbnails(posts, GEOMETRY, "card_thumbnail")
+
+        for name, run in (("по одной", one_by_one), ("пакетом", batched)):
+            timings, queries = [], 0
+            for _ in range(options["repeat"]):
+                if not options["warm"]:
+                    default.kvstore.cache.delete_many(keys)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries += len(captured)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>9}: p50 {statistics.median(timings):.2f} мс, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс, "
+                f"запросов к БД на страницу: {queries / options['repeat']:g}"
+            )
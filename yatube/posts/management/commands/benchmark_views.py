@@ -0,0 +1,111 @@
+import json
+import os
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import (
+    DATASETS, METRICS, check_budgets, dataset_summary, run_benchmarks,
+    seeded_database,
+)
+
+BUDGETS_FILE = os.path.join(
+    settings.BASE_DIR, "posts", "benchmark_budgets.json"
+)
+# Запас при --update-budgets: время плавает от машины к машине, число
+# запросов - нет.
+HEADROOM = {"p50_ms": 2, "p95_ms": 2, "queries": 1, "memory_kb": 1.5}
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет index, group_posts, profile, post_detail, create_post и "
+        "add_comment на тестовой базе, заполненной seed_data, и падает, "
+        "если представление вышло за бюджет."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dataset", action="append", choices=list(DATASETS),
+            help="Набор данных; можно несколько. По умолчанию small и "
+                 "medium.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--budgets", default=BUDGETS_FILE)
+        parser.add_argument(
+            "--output", help="Куда записать результаты в формате JSON."
+        )
+        parser.add_argument(
+            "--update-budgets", action="store_true",
+            help="Записать измеренные значения с запасом как новые бюджеты.",
+        )
+
+    def handle(self, *args, **options):
+        datasets = options["dataset"] or ["small", "medium"]
+        budgets = {}
+        if os.path.exists(options["budgets"]):
+            with open(options["budgets"], encoding="utf-8") as budgets_file:
+                budgets = json.load(budgets_file)
+
+        results = {
+            "python": platform.python_version(),
+            "repeat": options["repeat"],
+            "datasets": {},
+        }
+        violations = []
+        for dataset in datasets:
+            summary, measured = self.run_dataset(dataset, options)
+            results["datasets"][dataset] = {
+                "rows": summary, "views": measured,
+            }
+            self.report(dataset, measured)
+            violations.extend(
+                (dataset, *violation)
+                for violation in check_budgets(
+                    measured, budgets.get(dataset, {})
+                )
+            )
+            if options["update_budgets"]:
+                budgets[dataset] = {
+                    name: {
+                        metric: round(
+                            metrics[metric] * HEADROOM[metric],
+                            2 if metric.endswith("_ms") else None,
+                        )
+                        for metric in METRICS
+                    }
+                    for name, metrics in measured.items()
+                }
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if options["update_budgets"]:
+            with open(options["budgets"], "w", encoding="utf-8") as output:
+                json.dump(budgets, output, indent=2, sort_keys=True)
+                output.write("\n")
+            return
+        if violations:
+            raise CommandError("Превышены бюджеты:\n" + "\n".join(
+                f"  {dataset} {name} {metric}: {value} > {budget}"
+                for dataset, name, metric, value, budget in violations
+            ))
+        self.stdout.write(self.style.SUCCESS("Все бюджеты соблюдены"))
+
+    def run_dataset(self, dataset, options):
+        self.stdout.write(f"Набор {dataset}: заполнение базы...")
+        with seeded_database(dataset, options["seed"]):
+            return dataset_summary(), run_benchmarks(options["repeat"])
+
+    def report(self, dataset, measured):
+        self.stdout.write(
+            f"{'':>12} {'p50, мс':>9} {'p95, мс':>9} {'запросов':>9} "
+            f"{'память, КБ':>11}"
+        )
+        for name, metrics in measured.items():
+            self.stdout.write(
+                f"{name:>12} {metrics['p50_ms']:>9} {metrics['p95_ms']:>9} "
+                f"{metrics['queries']:>9} {metrics['memory_kb']:>11}"
+            )
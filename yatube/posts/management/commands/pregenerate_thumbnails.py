@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Создаёт миниатюры для картинок уже опубликованных постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Число потоков, создающих миниатюры; 1 - без пула.",
+        )
+
+    def handle(self, *args, **options):
+        images = (
+            Post.objects.exclude(image="")
+            .order_by("pk")
+            .values_list("image", flat=True)
+            .iterator()
+        )
+        processed = created = 0
+        if options["workers"] > 1:
+            results = self.generate_in_pool(images, options["workers"])
+        else:
+            results = map(generate_thumbnails, images)
+        for count in results:
+            processed += 1
+            created += count
+        self.stdout.write(self.style.SUCCESS(
+            f"Картинок обработано: {processed}, миниатюр: {created}"
+        ))
+
+    def generate_in_pool(self, images, workers):
+        # Отдаём пулу картинки порциями, а не весь список сразу.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = list(islice(images, workers * 10))
+                if not batch:
+                    break
+                yield from pool.map(generate_thumbnails, batch)
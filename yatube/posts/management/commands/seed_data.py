@@ -0,0 +1,224 @@
+import io
+import multiprocessing
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from faker import Faker
+
+from posts import seeding
+from posts.counters import rebuild_counters
+from posts.exports import parse_since
+from posts.importing import insert_rows
+from posts.models import Comment, Group, Post
+from posts.search import get_backend
+
+User = get_user_model()
+
+SEED_IMAGES = 5
+# Начало периода публикаций по умолчанию: постоянное, чтобы при одном
+# --seed совпадали и даты.
+START = "2022-01-01"
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу тестовыми пользователями, группами, постами и "
+        "комментариями для нагрузочных замеров. При одном и том же --seed "
+        "данные одинаковы при любом числе процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--comments", type=int, default=200000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers", type=int, default=multiprocessing.cpu_count(),
+            help="Процессов, генерирующих текст; 1 - без пула.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Строк в одной порции и одной транзакции.",
+        )
+        parser.add_argument(
+            "--skew", type=float, default=1.0,
+            help="Показатель распределения Ципфа для авторов; 0 - поровну.",
+        )
+        parser.add_argument(
+            "--group-share", type=float, default=0.7,
+            help="Доля постов, опубликованных в группе.",
+        )
+        parser.add_argument(
+            "--image-share", type=float, default=0.0,
+            help="Доля постов с картинкой.",
+        )
+        parser.add_argument(
+            "--start", default=START,
+            help="Начало периода публикаций: ISO-дата или дата со "
+            "временем.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=365,
+            help="На сколько дней от --start распределить посты.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 and (options["posts"] or options["comments"]):
+            raise CommandError("Постам и комментариям нужны авторы.")
+        if options["comments"] and not options["posts"]:
+            raise CommandError("Комментариям нужны посты.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля.")
+        try:
+            start = parse_since(options["start"])
+        except ValueError as exc:
+            raise CommandError(exc)
+        started = time.perf_counter()
+        fake = Faker("ru_RU")
+        fake.seed_instance(options["seed"])
+
+        end = start + timedelta(days=options["days"])
+        context = {
+            "seed": options["seed"],
+            "skew": options["skew"],
+            "start": start,
+            "end": end,
+            "author_ids": self.create_users(fake, options["users"]),
+            "group_ids": self.create_groups(fake, options["groups"]),
+            "group_share": options["group_share"],
+            "images": self.create_images(options["image_share"]),
+            "image_share": options["image_share"],
+            "post_step": (end - start) / max(options["posts"], 1),
+        }
+
+        search_backend = get_backend()
+        search_backend.suspend(connection)
+        try:
+            context["post_ids"] = self.write(
+                Post, seeding.POST_COLUMNS, seeding.post_rows,
+                options["posts"], context, options,
+            )
+            self.write(
+                Comment, seeding.COMMENT_COLUMNS, seeding.comment_rows,
+                options["comments"], context, options,
+            )
+        finally:
+            self.stdout.write("Пересборка поискового индекса")
+            search_backend.install(connection)
+
+        # Строки пишутся мимо моделей и сигналов: счётчики пересчитываются
+        # целиком, а закэшированные страницы устаревают все сразу.
+        rebuild_counters()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.perf_counter() - started:.1f} с"
+        ))
+
+    def create_users(self, fake, count):
+        if not count:
+            return []
+        last_id = User.objects.aggregate(last=Max("pk"))["last"] or 0
+        # Хэш пароля считается долго, поэтому он один на всех.
+        password = make_password("password")
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{fake.user_name()}_{last_id + number + 1}",
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                    password=password,
+                )
+                for number in range(count)
+            )
+        )
+        # Порядок id задаёт ранг автора в распределении Ципфа.
+        return list(
+            User.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_groups(self, fake, count):
+        if not count:
+            return []
+        last_id = Group.objects.aggregate(last=Max("pk"))["last"] or 0
+        Group.objects.bulk_create(
+            Group(
+                title=fake.catch_phrase(),
+                slug=f"seed-{last_id + number + 1}",
+                description=fake.paragraph(),
+            )
+            for number in range(count)
+        )
+        return list(
+            Group.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_images(self, share):
+        if not share:
+            return []
+        from PIL import Image
+
+        names = []
+        for number in range(SEED_IMAGES):
+            name = f"posts/seed_{number}.png"
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                color = (number * 50 % 256, 120, 255 - number * 40 % 256)
+                Image.new("RGB", (960, 540), color).save(buffer, "PNG")
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue())
+                )
+            names.append(name)
+        return names
+
+    def write(self, model, columns, generate, total, context, options):
+        """Пишет `total` строк порциями и возвращает диапазон их id.
+
+        Текст генерируют процессы пула, а в базу пишет только главный
+        процесс: SQLite всё равно допускает одного писателя. Вместо
+        bulk_create - executemany по готовым кортежам: на миллионах строк
+        сборка экземпляров моделей и SQL для них втрое дороже вставки.
+        """
+        if not total:
+            return None
+        last_id = model.objects.aggregate(last=Max("pk"))["last"] or 0
+        chunks = seeding.chunks(total, options["chunk_size"])
+        written, started = 0, time.perf_counter()
+        with self.generator(context, options["workers"]) as imap:
+            for rows in imap(generate, chunks):
+                with transaction.atomic():
+                    insert_rows(model, columns, rows)
+                written += len(rows)
+                self.stdout.write(
+                    f"{model._meta.db_table}: {written}/{total}, "
+                    f"{written / (time.perf_counter() - started):.0f} строк/с"
+                )
+        ids = model.objects.filter(pk__gt=last_id).aggregate(
+            first=Min("pk"), last=Max("pk")
+        )
+        return ids["first"], ids["last"]
+
+    @contextmanager
+    def generator(self, context, workers):
+        if workers <= 1:
+            seeding.init_worker(context)
+            yield map
+            return
+        with multiprocessing.Pool(
+            workers, initializer=seeding.init_worker, initargs=(context,)
+        ) as pool:
+            # imap сохраняет порядок порций: id растут вместе с датами.
+            yield pool.imap
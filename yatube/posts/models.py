@@ -8,21 +8,59 @@ from django.contrib.auth.models import User
 User = get_user_model()
 
 
-class Group(models.Model):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при сохранении уже существующей записи.
+
+    Счётчики меняются атомарным UPDATE ... SET n = n + 1 из сигналов,
+    а экземпляр, загруженный формой редактирования, хранит устаревшее
+    значение и затёр бы параллельные изменения.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200, verbose_name="Название")
     slug = models.SlugField(unique=True, verbose_name="Slug")
     description = models.TextField(verbose_name="Описание")
+    post_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Число постов",
+    )
+    # Счётчик меняется через update() и дату не сдвигает.
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
+
+    counter_fields = ("post_count",)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     text = models.TextField(verbose_name="Текст")
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата публикации"
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения"
+    )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name="posts",
@@ -42,6 +80,37 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Число комментариев",
+    )
+
+    counter_fields = ("comment_count",)
+
+    class Meta:
+        # Индексы под ленты: вся лента, лента группы и лента автора
+        # сортируются по -pub_date. Индексы по updated отвечают на
+        # MAX(updated) для ETag/Last-Modified лент (posts.conditional),
+        # (updated, id) - инкрементальной выгрузке (posts.exports).
+        indexes = [
+            models.Index(fields=["pub_date"], name="post_pub_date_idx"),
+            models.Index(
+                fields=["group", "pub_date"], name="post_group_pub_date_idx"
+            ),
+            models.Index(
+                fields=["author", "pub_date"], name="post_author_pub_date_idx"
+            ),
+            models.Index(
+                fields=["group", "updated"], name="post_group_updated_idx"
+            ),
+            models.Index(
+                fields=["author", "updated"], name="post_author_updated_idx"
+            ),
+            models.Index(
+                fields=["updated", "id"], name="post_updated_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.text[:15]}..."
@@ -63,5 +132,148 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # Комментарии поста листаются keyset-паджинацией по (created, id);
+        # по (created, id) без поста - инкрементальная выгрузка.
+        indexes = [
+            models.Index(
+                fields=["post", "created", "id"],
+                name="comment_post_created_id_idx",
+            ),
+            models.Index(
+                fields=["created", "id"], name="comment_created_id_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.text
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора: у встроенной модели User своих полей не добавить."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="post_stats",
+        verbose_name="Автор",
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число постов",
+    )
+    follower_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число подписчиков",
+    )
+    # Когда автор последний раз менял имя или username (posts.signals):
+    # они выводятся в карточках на чужих страницах.
+    profile_updated = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="Дата изменения имени",
+    )
+
+    def __str__(self):
+        return f"{self.author}: {self.post_count}"
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="follower",
+        verbose_name="Подписчик",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="following",
+        verbose_name="Автор",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="follow_unique_pair"
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F("author")),
+                name="follow_not_self",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.author}"
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (posts.timelines).
+
+    Записи создаются при публикации поста для каждого подписчика автора;
+    pub_date повторяет дату поста, чтобы страница ленты читалась по
+    индексу одной таблицы.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Читатель",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="timeline_unique_post"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "pub_date", "post"],
+                name="timeline_user_pub_date_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.post_id}"
+
+
+class ImportCheckpoint(models.Model):
+    """Контрольная точка команды import_data.
+
+    Сохраняется в той же транзакции, что и пачка строк: после сбоя точка
+    всегда указывает ровно на последнюю записанную пачку, и строки без
+    id из файла не загружаются повторно.
+    """
+
+    source = models.CharField(
+        max_length=500,
+        unique=True,
+        verbose_name="Источник",
+    )
+    table = models.CharField(max_length=20, verbose_name="Таблица")
+    done = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Обработано строк",
+    )
+    imported = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Загружено строк",
+    )
+    skipped = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Пропущено строк",
+    )
+
+    def __str__(self):
+        return f"{self.source}: {self.done}"
@@ -0,0 +1,210 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class CursorPage(Sequence):
+    """Страница курсорной паджинации.
+
+    В отличие от `django.core.paginator.Page` не знает ни номера страницы,
+    ни общего количества записей: вместо них - непрозрачные токены
+    `next_cursor`/`previous_cursor` для ссылок `?after=`/`?before=`.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-паджинатор: страница выбирается условием по ключу сортировки
+    вместо `OFFSET`, поэтому не нужен `COUNT(*)`, глубокие страницы стоят
+    столько же, сколько первая, а новые записи не сдвигают уже открытые
+    страницы.
+
+    `ordering` должен однозначно упорядочивать записи, поэтому последним
+    полем в нём всегда идёт первичный ключ.
+    """
+
+    def __init__(self, object_list, per_page, ordering=("-pub_date", "-id")):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу после курсора `after` или перед курсором
+        `before`; без курсора (или с испорченным курсором) - первую."""
+        after = self.decode_cursor(after)
+        before = None if after else self.decode_cursor(before)
+        rows, more = self.fetch(after, before)
+        if before:
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = after is not None, more
+
+        if not rows:
+            return CursorPage([], self, None, None)
+        return CursorPage(
+            rows,
+            self,
+            self.encode_cursor(rows[-1]) if has_next else None,
+            self.encode_cursor(rows[0]) if has_previous else None,
+        )
+
+    def fetch(self, after=None, before=None):
+        """Не больше per_page строк после разобранного курсора `after`
+        (или перед `before`) в порядке `ordering` и признак, что в
+        направлении чтения за ними есть ещё строки."""
+        if before:
+            queryset = self.object_list.filter(
+                self._keyset_filter(before, reverse=True)
+            ).order_by(*self._reversed_ordering())
+            rows = list(queryset[:self.per_page + 1])
+            return rows[:self.per_page][::-1], len(rows) > self.per_page
+        queryset = self.object_list.order_by(*self.ordering)
+        if after:
+            queryset = queryset.filter(self._keyset_filter(after))
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, token):
+        """Разбирает токен в список значений ключа; `None`, если токена нет
+        или он не соответствует ключу сортировки."""
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            values = json.loads(raw)
+        except (binascii.Error, ValueError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            return None
+        opts = self.object_list.model._meta
+        try:
+            return [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValidationError):
+            return None
+
+    def _keyset_filter(self, values, reverse=False):
+        """Условие "строго после `values`" в порядке `ordering`:
+        a <= x AND ((a < x) OR (a = x AND b < y) OR ...) для убывающих
+        полей. Первое условие избыточно, но по нему база начинает чтение
+        индекса сразу с курсора, а не с начала ленты."""
+        first = "lt" if self.ordering[0].startswith("-") != reverse else "gt"
+        bound = Q(**{f"{self.fields[0]}__{first}e": values[0]})
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith("-")
+            if reverse:
+                descending = not descending
+            lookup = "lt" if descending else "gt"
+            prefix = {
+                field: value
+                for field, value in zip(self.fields[:index], values)
+            }
+            prefix[f"{self.fields[index]}__{lookup}"] = values[index]
+            condition |= Q(**prefix)
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ]
+
+
+class MergedCursorPaginator:
+    """Keyset-паджинация по объединению нескольких источников.
+
+    `sources` - пары (CursorPaginator, item): паджинатор источника и
+    функция, которая превращает его строку в объект страницы. Ключи
+    сортировки источников должны совпадать по смыслу и направлению
+    (например, ("-pub_date", "-id") у постов и ("-pub_date", "-post_id")
+    у записей ленты), тогда курсор одного подходит всем. Каждый
+    источник читает не больше per_page + 1 строк, поэтому страница
+    стоит O(per_page) на источник. Объект, пришедший из нескольких
+    источников, показывается один раз.
+    """
+
+    def __init__(self, sources, per_page):
+        self.sources = list(sources)
+        self.per_page = int(per_page)
+        self.descending = self.sources[0][0].ordering[0].startswith("-")
+
+    def get_page(self, after=None, before=None):
+        paginator = self.sources[0][0]
+        after = paginator.decode_cursor(after)
+        before = None if after else paginator.decode_cursor(before)
+
+        rows, more = [], False
+        for source, item in self.sources:
+            fetched, source_more = source.fetch(after, before)
+            more = more or source_more
+            for row in fetched:
+                key = [getattr(row, name) for name in source.fields]
+                rows.append((key, item(row), source, row))
+        rows.sort(key=lambda entry: entry[0], reverse=self.descending)
+        seen = set()
+        rows = [
+            entry for entry in rows
+            if not (entry[1].pk in seen or seen.add(entry[1].pk))
+        ]
+        if len(rows) > self.per_page:
+            more = True
+            rows = rows[-self.per_page:] if before else rows[:self.per_page]
+        if before:
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = after is not None, more
+
+        if not rows:
+            return CursorPage([], self, None, None)
+        return CursorPage(
+            [obj for _, obj, _, _ in rows],
+            self,
+            self._cursor(rows[-1]) if has_next else None,
+            self._cursor(rows[0]) if has_previous else None,
+        )
+
+    def _cursor(self, entry):
+        _, _, source, row = entry
+        return source.encode_cursor(row)
@@ -0,0 +1,131 @@
+import re
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+
+class SimpleSearchBackend:
+    """Поиск без индекса: LIKE по каждому слову запроса. Работает на любой
+    СУБД и нужен там, где полнотекстового индекса нет."""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in query.split():
+            condition &= Q(text__icontains=term)
+        return queryset.filter(condition).order_by("-pub_date", "-id")
+
+    def install(self, db_connection):
+        pass
+
+    def suspend(self, db_connection):
+        pass
+
+
+class SQLiteFTSBackend:
+    """Полнотекстовый поиск по индексу FTS5 с ранжированием bm25.
+
+    Индекс - external content таблица поверх posts_post: сам текст не
+    дублируется, а триггеры обновляют индекс при любой вставке, правке и
+    удалении поста, в том числе при bulk_create и queryset.update().
+    """
+
+    table = "posts_post_fts"
+    triggers = {
+        "posts_post_fts_insert": (
+            "AFTER INSERT ON posts_post BEGIN "
+            "INSERT INTO posts_post_fts(rowid, text) "
+            "VALUES (new.id, new.text); END"
+        ),
+        "posts_post_fts_delete": (
+            "AFTER DELETE ON posts_post BEGIN "
+            "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); END"
+        ),
+        "posts_post_fts_update": (
+            "AFTER UPDATE OF text ON posts_post BEGIN "
+            "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); "
+            "INSERT INTO posts_post_fts(rowid, text) "
+            "VALUES (new.id, new.text); END"
+        ),
+    }
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f"{self.table}.rowid = posts_post.id",
+                f"{self.table} MATCH %s",
+            ],
+            params=[match],
+            select={"rank": f"bm25({self.table})"},
+            order_by=["rank", "-pub_date"],
+        )
+
+    @staticmethod
+    def match_expression(query):
+        # Каждое слово - отдельная фраза с поиском по префиксу: кавычки и
+        # операторы FTS5 из пользовательского ввода не интерпретируются.
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def install(self, db_connection):
+        """Создаёт индекс и триггеры, если их нет. SQLite пересоздаёт
+        таблицу posts_post при части миграций, и триггеры теряются, -
+        тогда индекс после восстановления пересобирается целиком."""
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                "text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND tbl_name = 'posts_post'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = set(self.triggers) - existing
+            for name in missing:
+                cursor.execute(f"CREATE TRIGGER {name} {self.triggers[name]}")
+            if missing:
+                self.rebuild(db_connection)
+
+    def suspend(self, db_connection):
+        """Снимает триггеры перед массовой загрузкой: один rebuild после
+        неё дешевле, чем обновление индекса на каждой вставке. Индекс
+        вернёт `install`."""
+        with db_connection.cursor() as cursor:
+            for name in self.triggers:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def rebuild(self, db_connection):
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')"
+            )
+
+
+def get_backend(db_connection=connection):
+    """Бэкенд из настройки `POSTS_SEARCH_BACKEND`; если она пуста -
+    FTS5 на SQLite и LIKE на остальных СУБД."""
+    if settings.POSTS_SEARCH_BACKEND:
+        return import_string(settings.POSTS_SEARCH_BACKEND)()
+    if db_connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return SimpleSearchBackend()
+
+
+def search_posts(queryset, query):
+    return get_backend().search(queryset, query)
+
+
+def install_search_index(sender, using, **kwargs):
+    """Обработчик `post_migrate`: восстанавливает индекс после миграций."""
+    db_connection = connections[using]
+    if "posts_post" in db_connection.introspection.table_names():
+        get_backend(db_connection).install(db_connection)
@@ -0,0 +1,125 @@
+"""Генерация строк для seed_data.
+
+Модуль не обращается к базе и не импортирует модели: функции выполняются
+в процессах пула и возвращают кортежи, которые пишет главный процесс.
+Каждая порция строк зависит только от зерна и своего номера, поэтому
+результат не зависит от числа процессов и порядка их работы.
+"""
+import bisect
+import itertools
+import random
+
+from faker import Faker
+
+POST_COLUMNS = (
+    "text", "pub_date", "updated", "author_id", "group_id", "image",
+    "comment_count",
+)
+COMMENT_COLUMNS = ("text", "created", "post_id", "author_id")
+
+# Faker тратит на абзац около трети миллисекунды - на миллионах постов
+# это десятки минут. Поэтому Faker один раз заполняет словарь
+# предложений, а тексты собираются из него.
+SENTENCES = 5000
+
+# Общие для всех порций данные: передаются в процесс пула один раз через
+# initializer, а не с каждой задачей.
+_context = {}
+
+
+def init_worker(context):
+    _context.clear()
+    _context.update(context)
+    fake = Faker("ru_RU")
+    fake.seed_instance(context["seed"])
+    _context["sentences"] = [
+        fake.sentence(nb_words=10) for _ in range(SENTENCES)
+    ]
+    _context["author_weights"] = zipf_weights(
+        len(context["author_ids"]), context["skew"]
+    )
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса распределения Ципфа: первый автор пишет больше
+    всех, второй - в 2**exponent раз меньше и т. д."""
+    return list(
+        itertools.accumulate(
+            1 / rank ** exponent for rank in range(1, count + 1)
+        )
+    )
+
+
+def _choose_author(rng):
+    weights = _context["author_weights"]
+    point = rng.random() * weights[-1]
+    return _context["author_ids"][bisect.bisect_right(weights, point)]
+
+
+def _text(rng, low, high):
+    sentences = rng.choices(_context["sentences"], k=rng.randint(low, high))
+    return " ".join(sentences)
+
+
+def _pub_date(number):
+    """Дата поста с номером `number`: свой шаг периода и сдвиг внутри
+    него, который зависит только от зерна и номера (мультипликативный
+    хэш Кнута). Поэтому comment_rows знает даты постов, не читая базу."""
+    mixed = (number + 1) * 2654435761 + _context["seed"] * 40503
+    shift = mixed % 2 ** 32 / 2 ** 32
+    return _context["start"] + _context["post_step"] * (number + shift)
+
+
+def post_rows(chunk):
+    """Строки постов порции в порядке POST_COLUMNS.
+
+    Даты растут вместе с номером поста, как у настоящей ленты."""
+    index, first, count = chunk
+    rng = random.Random(f"{_context['seed']}:posts:{index}")
+    group_ids, images = _context["group_ids"], _context["images"]
+    rows = []
+    for number in range(first, first + count):
+        pub_date = _pub_date(number)
+        group_id = None
+        if group_ids and rng.random() < _context["group_share"]:
+            group_id = rng.choice(group_ids)
+        image = ""
+        if images and rng.random() < _context["image_share"]:
+            image = rng.choice(images)
+        rows.append((
+            _text(rng, 1, 8), pub_date, pub_date, _choose_author(rng),
+            group_id, image, 0,
+        ))
+    return rows
+
+
+def comment_rows(chunk):
+    """Строки комментариев порции в порядке COMMENT_COLUMNS.
+
+    Чаще всего комментируют свежие посты; дата комментария - между
+    датой его поста и концом периода. Номер поста - его смещение от
+    первого id: посты пишутся одним проходом, id идут подряд."""
+    index, first, count = chunk
+    rng = random.Random(f"{_context['seed']}:comments:{index}")
+    end = _context["end"]
+    first_id, last_id = _context["post_ids"]
+    posts = last_id - first_id + 1
+    rows = []
+    for _ in range(count):
+        offset = posts - 1 - int(posts * rng.random() ** 3)
+        posted = _pub_date(offset)
+        rows.append((
+            _text(rng, 1, 2),
+            posted + (end - posted) * rng.random(),
+            first_id + offset,
+            _choose_author(rng),
+        ))
+    return rows
+
+
+def chunks(total, size):
+    """Порции (номер, первый номер строки, размер) для пула."""
+    return [
+        (index, first, min(size, total - first))
+        for index, first in enumerate(range(0, total, size))
+    ]
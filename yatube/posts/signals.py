@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from . import timelines
+from .cache import invalidate_feeds
+from .counters import (
+    change_author_counter, change_author_post_count, change_counter,
+)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .thumbnails import schedule_thumbnails
+
+
+def _group_feeds(group_ids):
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list("slug", flat=True)
+    return [("group", slug) for slug in slugs]
+
+
+def _profile_feeds(author_ids):
+    usernames = User.objects.filter(pk__in=author_ids).values_list(
+        "username", flat=True
+    )
+    return [("profile", username) for username in usernames]
+
+
+def _invalidate_post_pages(post, group_ids, author_ids):
+    # Число постов автора выводится рядом с каждым его постом: сбрасываем
+    # поколение автора, а не перебираем страницы его постов.
+    invalidate_feeds(
+        ("index",),
+        ("post", post.pk),
+        *_group_feeds(group_ids),
+        *_profile_feeds(author_ids),
+        *(("author", pk) for pk in author_ids if pk is not None),
+    )
+
+
+@receiver(post_init, sender=Post)
+def remember_post_relations(sender, instance, **kwargs):
+    # Берём значения из __dict__, чтобы не подгружать отложенные поля.
+    instance._saved_author_id = instance.__dict__.get("author_id")
+    instance._saved_group_id = instance.__dict__.get("group_id")
+    image = instance.__dict__.get("image")
+    instance._saved_image = getattr(image, "name", image)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_author_id = instance._saved_author_id
+    old_group_id = instance._saved_group_id
+    if created:
+        change_author_post_count(instance.author_id, 1)
+        change_counter(Group, instance.group_id, "post_count", 1)
+        timelines.fan_out(instance)
+    else:
+        if old_author_id != instance.author_id:
+            change_author_post_count(old_author_id, -1)
+            change_author_post_count(instance.author_id, 1)
+            instance.timeline_entries.all().delete()
+            timelines.fan_out(instance)
+        if old_group_id != instance.group_id:
+            change_counter(Group, old_group_id, "post_count", -1)
+            change_counter(Group, instance.group_id, "post_count", 1)
+    _invalidate_post_pages(
+        instance,
+        {old_group_id, instance.group_id},
+        {old_author_id, instance.author_id},
+    )
+    if instance.image and instance.image.name != instance._saved_image:
+        schedule_thumbnails(instance)
+    instance._saved_author_id = instance.author_id
+    instance._saved_group_id = instance.group_id
+    instance._saved_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_post_count(instance.author_id, -1)
+    change_counter(Group, instance.group_id, "post_count", -1)
+    _invalidate_post_pages(
+        instance, {instance.group_id}, {instance.author_id}
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_author_counter(instance.author_id, "follower_count", 1)
+        timelines.backfill([instance.user_id], instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, "follower_count", -1)
+    timelines.remove_author(instance.user_id, instance.author_id)
+    # Автор опустился ниже порога: его посты снова раскладываются, и
+    # ленты подписчиков догоняют то, что раньше подмешивалось при чтении.
+    if AuthorStats.objects.filter(
+        author_id=instance.author_id,
+        follower_count=settings.POSTS_FANOUT_MAX_FOLLOWERS - 1,
+    ).exists():
+        timelines.backfill(
+            Follow.objects.filter(author_id=instance.author_id)
+            .values_list("user_id", flat=True).iterator(),
+            instance.author_id,
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_counter(Post, instance.post_id, "comment_count", 1)
+    invalidate_feeds(("post", instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_counter(Post, instance.post_id, "comment_count", -1)
+    invalidate_feeds(("post", instance.post_id))
+
+
+@receiver(post_init, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._saved_slug = instance.__dict__.get("slug")
+
+
+def _invalidate_group_pages(group, slugs):
+    """Название и адрес группы выводятся в карточках её постов на главной,
+    в профилях и на страницах постов; эти страницы зависят от поколения
+    ("group-info", pk) (posts.cache.page_depends_on)."""
+    invalidate_feeds(
+        ("group-info", group.pk),
+        *(("group", slug) for slug in slugs if slug),
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        invalidate_feeds(("group", instance.slug))
+    else:
+        _invalidate_group_pages(
+            instance, {instance._saved_slug, instance.slug}
+        )
+    instance._saved_slug = instance.slug
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    _invalidate_group_pages(instance, {instance.slug})
+
+
+# Поля пользователя, которые выводятся на страницах постов.
+SHOWN_USER_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(post_init, sender=User)
+def remember_user_name(sender, instance, **kwargs):
+    instance._saved_names = {
+        field: instance.__dict__.get(field) for field in SHOWN_USER_FIELDS
+    }
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_username = instance._saved_names["username"]
+    names = {field: getattr(instance, field) for field in SHOWN_USER_FIELDS}
+    if created:
+        invalidate_feeds(("profile", instance.username))
+    elif names != instance._saved_names:
+        # Имя и адрес автора выводятся в карточках его постов на главной,
+        # в группах и на страницах постов - они зависят от ("author", pk),
+        # а их валидаторы (posts.conditional) - от profile_updated.
+        AuthorStats.objects.update_or_create(
+            author_id=instance.pk, defaults={"profile_updated": now()}
+        )
+        invalidate_feeds(
+            ("author", instance.pk),
+            *(("profile", username) for username in {
+                old_username, instance.username
+            } if username),
+        )
+    instance._saved_names = names
@@ -0,0 +1,68 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..benchmarks import (
+    DATASETS, METRICS, TEMPLATE_MODES, check_budgets, run_benchmarks,
+    run_fanout_benchmarks, run_template_benchmarks,
+)
+from ..management.commands.benchmark_views import BUDGETS_FILE
+
+VIEWS = (
+    "index", "group_posts", "profile", "post_detail", "create_post",
+    "add_comment",
+)
+
+
+class ViewBenchmarkTest(TestCase):
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_measures_every_view(self):
+        call_command(
+            "seed_data", users=3, groups=2, posts=20, comments=10,
+            workers=1, stdout=StringIO(),
+        )
+        results = run_benchmarks(repeat=2)
+        self.assertEqual(tuple(results), VIEWS)
+        for name, metrics in results.items():
+            with self.subTest(view=name):
+                self.assertEqual(set(metrics), set(METRICS))
+                self.assertGreater(metrics["queries"], 0)
+                self.assertLessEqual(metrics["p50_ms"], metrics["p95_ms"])
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_measures_template_rendering_in_every_mode(self):
+        call_command(
+            "seed_data", users=3, groups=2, posts=20, comments=10,
+            workers=1, stdout=StringIO(),
+        )
+        results = run_template_benchmarks(repeat=2)
+        self.assertEqual(tuple(results), VIEWS[:4])
+        for name, modes in results.items():
+            with self.subTest(view=name):
+                self.assertEqual(set(modes), set(TEMPLATE_MODES))
+
+    def test_measures_fanout(self):
+        results = run_fanout_benchmarks([3, 5], repeat=2)
+        self.assertEqual(list(results), [3, 5])
+        for count, metrics in results.items():
+            with self.subTest(followers=count):
+                self.assertEqual(metrics["entries_per_post"], count)
+                self.assertLessEqual(metrics["read_queries"], 3)
+
+    def test_check_budgets_reports_only_exceeded_metrics(self):
+        results = {"index": {"p95_ms": 12.0, "queries": 5}}
+        budgets = {"index": {"p95_ms": 20, "queries": 4}}
+        self.assertEqual(
+            check_budgets(results, budgets), [("index", "queries", 5, 4)]
+        )
+        self.assertEqual(check_budgets(results, {}), [])
+
+    def test_stored_budgets_cover_all_datasets_and_views(self):
+        with open(BUDGETS_FILE, encoding="utf-8") as budgets_file:
+            budgets = json.load(budgets_file)
+        self.assertEqual(set(budgets), set(DATASETS))
+        for dataset, views in budgets.items():
+            with self.subTest(dataset=dataset):
+                self.assertEqual(set(views), set(VIEWS))
@@ -0,0 +1,215 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    Client, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import reverse
+
+from ..cache import page_cache_stats, post_card_key
+from ..checks import check_page_cache_is_shared
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("auth")
+        self.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        self.other_group = Group.objects.create(
+            title="другая", slug="other", description="описание"
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text="пост"
+        )
+        self.urls = {
+            "index": reverse("posts:index"),
+            "group": reverse("posts:group_list", kwargs={"slug": "slug"}),
+            "other": reverse("posts:group_list", kwargs={"slug": "other"}),
+            "profile": reverse("posts:profile", kwargs={"username": "auth"}),
+            "detail": reverse(
+                "posts:post_detail", kwargs={"post_id": self.post.id}
+            ),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def assertCached(self, *names):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                hits = page_cache_stats()["hits"]
+                self.client.get(url)
+                self.assertEqual(
+                    page_cache_stats()["hits"] - hits,
+                    int(name in names),
+                )
+
+    def test_anonymous_pages_served_from_cache_without_queries(self):
+        for url in self.urls.values():
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_post_invalidates_its_feeds_only(self):
+        Post.objects.create(author=self.user, group=self.group, text="ещё")
+        self.assertCached("other")
+        response = self.client.get(self.urls["index"])
+        self.assertContains(response, "ещё")
+
+    def test_new_post_updates_author_count_on_other_post_pages(self):
+        Post.objects.create(author=self.user, text="ещё")
+        response = self.client.get(self.urls["detail"])
+        self.assertEqual(response.context["post_count"], 2)
+
+    def test_group_change_does_not_touch_its_posts(self):
+        self.group.title = "новое название"
+        with self.assertNumQueries(1):
+            self.group.save()
+        response = self.client.get(self.urls["index"])
+        self.assertContains(response, "новое название")
+
+    def test_user_rename_invalidates_pages_showing_author(self):
+        self.user.first_name = "Лев"
+        self.user.last_name = "Толстой"
+        self.user.save()
+        self.assertCached("other")
+        for name in ("index", "group", "profile", "detail"):
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertContains(response, "Лев Толстой")
+
+    def test_username_change_invalidates_old_profile(self):
+        self.user.username = "renamed"
+        self.user.save()
+        self.assertEqual(
+            self.client.get(self.urls["profile"]).status_code, 404
+        )
+        response = self.client.get(self.urls["detail"])
+        self.assertContains(response, "/profile/renamed/")
+
+    def test_last_login_update_keeps_pages_cached(self):
+        self.user.save(update_fields=["last_login"])
+        self.assertCached(*self.urls)
+
+    def test_comment_invalidates_post_page_only(self):
+        Comment.objects.create(post=self.post, author=self.user, text="к")
+        self.assertCached("index", "group", "other", "profile")
+
+    def test_group_change_invalidates_pages_showing_it(self):
+        self.group.title = "новое название"
+        self.group.save()
+        self.assertCached("other")
+
+    def test_post_delete_invalidates_its_feeds(self):
+        self.post.delete()
+        self.assertCached("other")
+
+    def test_authorized_user_sees_own_header(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(self.urls["index"])
+        self.assertContains(response, "Пользователь: auth")
+
+    def test_stats_for_staff_only(self):
+        url = reverse("posts:cache_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(
+            set(self.client.get(url).json()),
+            {"hits", "misses", "invalidations"},
+        )
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    LOCMEM = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+    MEMCACHED = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": "127.0.0.1:11211",
+        },
+    }
+
+    def errors(self):
+        return [error.id for error in check_page_cache_is_shared(None)]
+
+    def test_process_local_cache_rejected_for_page_cache(self):
+        with override_settings(CACHES=self.LOCMEM):
+            self.assertEqual(self.errors(), ["posts.E001"])
+            with override_settings(POSTS_PAGE_CACHE_TIMEOUT=0):
+                self.assertEqual(self.errors(), [])
+
+    def test_shared_cache_accepted(self):
+        with override_settings(CACHES=self.MEMCACHED):
+            self.assertEqual(self.errors(), [])
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("auth")
+        self.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        self.post = Post.objects.create(author=self.user, text="пост")
+        self.other = Post.objects.create(author=self.user, text="другой")
+
+    def card_key(self, post):
+        post.refresh_from_db()
+        return post_card_key(post)
+
+    def test_feed_reuses_cached_cards(self):
+        self.client.get(reverse("posts:index"))
+        self.assertIsNotNone(cache.get(self.card_key(self.post)))
+
+        Post.objects.filter(pk=self.post.pk).update(text="мимо сигналов")
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "мимо сигналов")
+
+    def test_edit_invalidates_only_that_card(self):
+        self.client.get(reverse("posts:index"))
+        old_key = self.card_key(self.post)
+        other_key = self.card_key(self.other)
+
+        self.post.group = self.group
+        self.post.save()
+        self.assertNotEqual(self.card_key(self.post), old_key)
+        self.assertEqual(self.card_key(self.other), other_key)
+
+        self.post.text = "новый текст"
+        self.post.save()
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "новый текст")
+
+    def test_author_rename_refreshes_cards(self):
+        self.client.get(reverse("posts:index"))
+        self.user.first_name = "Лев"
+        self.user.last_name = "Толстой"
+        self.user.save()
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "Лев Толстой", count=2)
+
+        self.user.username = "renamed"
+        self.user.save()
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "/profile/renamed/", count=2)
+
+    def test_thumbnails_prefetched_only_for_uncached_cards(self):
+        with mock.patch("posts.views.prefetch_thumbnails") as prefetch:
+            self.client.get(reverse("posts:index"))
+            self.client.get(reverse("posts:index"))
+        first, second = (call[0][0] for call in prefetch.call_args_list)
+        self.assertCountEqual(first, [self.post, self.other])
+        self.assertEqual(second, [])
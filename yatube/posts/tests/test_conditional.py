@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("auth")
+        self.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        self.old = Post.objects.create(
+            author=self.author, group=self.group, text="старый пост"
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text="пост"
+        )
+        self.urls = {
+            "post_detail": reverse(
+                "posts:post_detail", kwargs={"post_id": self.post.pk}
+            ),
+            "profile": reverse(
+                "posts:profile", kwargs={"username": "auth"}
+            ),
+            "group_posts": reverse(
+                "posts:group_list", kwargs={"slug": "slug"}
+            ),
+        }
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+    def test_not_modified_skips_rendering(self):
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response["ETag"].startswith('W/"'))
+                self.assertIn("Last-Modified", response)
+                self.assertIn("Cookie", response["Vary"])
+
+                with self.assertNumQueries(1):
+                    cache.clear()
+                    again = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again.content, b"")
+                self.assertEqual(again.templates, [])
+
+                # Страница из кэша тоже отвечает 304 - и без запросов.
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code, 304
+                    )
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.urls["post_detail"])
+        again = self.client.get(
+            self.urls["post_detail"],
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        responses = {
+            name: self.client.get(url) for name, url in self.urls.items()
+        }
+        Comment.objects.create(post=self.post, author=self.author, text="к")
+        self.old.delete()
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                self.assertEqual(
+                    self.revalidate(url, responses[name]).status_code, 200
+                )
+
+    def test_edit_changes_post_validators(self):
+        response = self.client.get(self.urls["post_detail"])
+        self.post.text = "новый текст"
+        self.post.save()
+        self.assertEqual(
+            self.revalidate(self.urls["post_detail"], response).status_code,
+            200,
+        )
+
+    def test_group_rename_changes_pages_showing_it(self):
+        responses = {
+            name: self.client.get(url) for name, url in self.urls.items()
+        }
+        self.group.title = "новое название"
+        self.group.save()
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                response = self.revalidate(url, responses[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "новое название")
+
+    def test_author_rename_changes_pages_showing_author(self):
+        responses = {
+            name: self.client.get(url) for name, url in self.urls.items()
+        }
+        self.author.first_name = "Лев"
+        self.author.last_name = "Толстой"
+        self.author.save()
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                response = self.revalidate(url, responses[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "Лев Толстой")
+
+    def test_validators_differ_per_user(self):
+        anonymous = self.client.get(self.urls["profile"])
+        client = Client()
+        client.force_login(self.author)
+        response = self.revalidate(self.urls["profile"], anonymous, client)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], anonymous["ETag"])
+
+    def test_missing_object_is_404(self):
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": 999})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,162 @@
+import csv
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..exports import EXPORTS, export_chunks, iter_batches, parse_since
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("auth", password="secret")
+        cls.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f"пост, \"{number}\"\nвторая строка",
+            )
+            for number in range(7)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text="комментарий"
+        )
+
+    def test_batches_follow_primary_key(self):
+        # 7 постов по 3: три пачки и ни одного лишнего запроса.
+        with self.assertNumQueries(3):
+            batches = list(iter_batches("posts", batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(
+            [row[0] for batch in batches for row in batch],
+            [post.pk for post in self.posts],
+        )
+        # Полная последняя пачка: ещё один запрос убеждается, что
+        # строк больше нет.
+        with self.assertNumQueries(2):
+            list(iter_batches("posts", batch_size=7))
+
+    def test_since_exports_changed_rows(self):
+        moment = timezone.now() - datetime.timedelta(hours=1)
+        Post.objects.exclude(pk=self.posts[0].pk).update(
+            updated=moment - datetime.timedelta(hours=1)
+        )
+        [batch] = iter_batches("posts", since=moment)
+        self.assertEqual([row[0] for row in batch], [self.posts[0].pk])
+        self.assertEqual(len(list(iter_batches("groups", since=moment))), 1)
+        Group.objects.update(updated=moment - datetime.timedelta(hours=1))
+        self.assertEqual(list(iter_batches("groups", since=moment)), [])
+
+    def test_since_batches_follow_time_and_primary_key(self):
+        moment = timezone.now() - datetime.timedelta(hours=1)
+        Post.objects.update(updated=moment - datetime.timedelta(hours=1))
+        # Одинаковое время у нескольких постов: пачки не теряют и не
+        # повторяют строки на границе.
+        Post.objects.filter(pk__gte=self.posts[3].pk).update(updated=moment)
+        Post.objects.filter(pk=self.posts[1].pk).update(
+            updated=moment + datetime.timedelta(minutes=1)
+        )
+        batches = list(iter_batches("posts", since=moment, batch_size=2))
+        self.assertEqual(
+            [row[0] for batch in batches for row in batch],
+            [post.pk for post in self.posts[3:]] + [self.posts[1].pk],
+        )
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN из SQLite")
+    def test_since_batches_use_indexes(self):
+        moment = timezone.now() - datetime.timedelta(hours=1)
+        cases = [
+            ("posts", "post_updated_id_idx"),
+            ("comments", "comment_created_id_idx"),
+        ]
+        for name, index in cases:
+            with self.subTest(table=name):
+                with CaptureQueriesContext(connection) as queries:
+                    list(iter_batches(name, since=moment, batch_size=1))
+                self.assertGreater(len(queries), 1)
+                with connection.cursor() as cursor:
+                    for query in queries.captured_queries:
+                        cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                        plan = " ".join(row[-1] for row in cursor)
+                        self.assertIn(index, plan)
+                        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_counter_changes_do_not_move_updated(self):
+        # Задокументировано в posts.exports: счётчики не двигают updated.
+        moment = timezone.now()
+        Comment.objects.create(
+            post=self.posts[1], author=self.author, text="ещё"
+        )
+        self.assertEqual(list(iter_batches("posts", since=moment)), [])
+        [batch] = iter_batches("comments", since=moment)
+        self.assertEqual([row[1] for row in batch], [self.posts[1].pk])
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO("".join(
+            export_chunks("posts", "csv")
+        ))))
+        columns = [column for column, _ in EXPORTS["posts"].columns]
+        self.assertEqual(rows[0], columns)
+        self.assertEqual(len(rows), 8)
+        first = dict(zip(columns, rows[1]))
+        self.assertEqual(first["text"], self.posts[0].text)
+        self.assertEqual(first["group"], "")
+        self.assertEqual(first["author"], "auth")
+        self.assertEqual(
+            first["pub_date"], self.posts[0].pub_date.isoformat()
+        )
+
+    def test_jsonl(self):
+        lines = "".join(export_chunks("comments", "jsonl")).splitlines()
+        self.assertEqual(len(lines), 1)
+        comment = json.loads(lines[0])
+        self.assertEqual(comment["post_id"], self.posts[0].pk)
+        self.assertEqual(comment["text"], "комментарий")
+
+    def test_users_without_secrets(self):
+        user = json.loads("".join(export_chunks("users", "jsonl")))
+        self.assertEqual(user["username"], "auth")
+        self.assertNotIn("password", user)
+
+    def test_parse_since(self):
+        self.assertEqual(
+            parse_since("2024-05-01"),
+            timezone.make_aware(datetime.datetime(2024, 5, 1)),
+        )
+        self.assertEqual(
+            parse_since("2024-05-01T10:00:00+00:00"),
+            datetime.datetime(2024, 5, 1, 10, tzinfo=datetime.timezone.utc),
+        )
+        with self.assertRaises(ValueError):
+            parse_since("вчера")
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "groups.csv")
+            call_command(
+                "export_data", "groups", format="csv", output=path,
+                stderr=StringIO(),
+            )
+            with open(path, encoding="utf-8", newline="") as exported:
+                rows = list(csv.reader(exported))
+        self.assertEqual(rows[1][1], "slug")
+
+    def test_command_rejects_bad_since(self):
+        with self.assertRaises(CommandError):
+            call_command("export_data", "posts", since="вчера")
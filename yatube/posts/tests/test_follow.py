@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..counters import rebuild_counters
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class FollowTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.reader = User.objects.create_user("reader")
+        self.stranger = User.objects.create_user("stranger")
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self, client=None, author="author"):
+        return (client or self.client).post(
+            reverse("posts:profile_follow", kwargs={"username": author})
+        )
+
+    def feed(self, user, query=None):
+        client = Client()
+        client.force_login(user)
+        return client.get(reverse("posts:follow_index"), query or {})
+
+    def texts(self, response):
+        return [post.text for post in response.context["page_obj"]]
+
+    def followers(self):
+        return AuthorStats.objects.get(author=self.author).follower_count
+
+    def test_follow_and_unfollow(self):
+        response = self.follow()
+        self.assertRedirects(
+            response,
+            reverse("posts:profile", kwargs={"username": "author"}),
+        )
+        self.follow()
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 1
+        )
+        self.assertEqual(self.followers(), 1)
+        profile = self.client.get(
+            reverse("posts:profile", kwargs={"username": "author"})
+        )
+        self.assertTrue(profile.context["following"])
+
+        self.client.post(
+            reverse("posts:profile_unfollow", kwargs={"username": "author"})
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.followers(), 0)
+
+    def test_cannot_follow_self_or_with_get(self):
+        self.follow(author="reader")
+        self.assertFalse(Follow.objects.exists())
+        response = self.client.get(
+            reverse("posts:profile_follow", kwargs={"username": "author"})
+        )
+        self.assertEqual(response.status_code, 405)
+
+    def test_anonymous_is_sent_to_login(self):
+        response = Client().get(reverse("posts:follow_index"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("users:login"), response.url)
+
+    def test_new_post_reaches_followers_only(self):
+        self.follow()
+        author = Client()
+        author.force_login(self.author)
+        author.post(reverse("posts:create_post"), {"text": "новый пост"})
+        self.assertEqual(self.texts(self.feed(self.reader)), ["новый пост"])
+        self.assertEqual(self.texts(self.feed(self.stranger)), [])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        Post.objects.create(author=self.author, text="старый пост")
+        self.follow()
+        self.assertEqual(self.texts(self.feed(self.reader)), ["старый пост"])
+        self.client.post(
+            reverse("posts:profile_unfollow", kwargs={"username": "author"})
+        )
+        self.assertEqual(self.texts(self.feed(self.reader)), [])
+
+    def test_rebuild_counters_counts_followers(self):
+        self.follow()
+        AuthorStats.objects.update(follower_count=7)
+        rebuild_counters()
+        self.assertEqual(self.followers(), 1)
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0, POSTS_FANOUT_MAX_FOLLOWERS=2)
+class PopularAuthorTest(TestCase):
+    """Посты популярных авторов не раскладываются, а подмешиваются в
+    ленту при чтении."""
+
+    def setUp(self):
+        self.star = User.objects.create_user("star")
+        self.author = User.objects.create_user("author")
+        self.reader = User.objects.create_user("reader")
+        self.fan = User.objects.create_user("fan")
+        for user in (self.reader, self.fan):
+            Follow.objects.create(user=user, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        # Посты по очереди от обычного и популярного автора.
+        start = timezone.now() - timedelta(days=1)
+        for i in range(25):
+            post = Post.objects.create(
+                author=self.star if i % 2 else self.author, text=f"пост {i}"
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start + timedelta(minutes=i)
+            )
+            TimelineEntry.objects.filter(post=post).update(
+                pub_date=start + timedelta(minutes=i)
+            )
+        self.client.force_login(self.reader)
+
+    def read_all(self, client):
+        texts, query = [], {}
+        while True:
+            response = client.get(reverse("posts:follow_index"), query)
+            texts += [post.text for post in response.context["page_obj"]]
+            after = response.context["page_obj"].next_cursor
+            if not after:
+                return texts, response
+            query = {"after": after}
+
+    def test_popular_posts_are_not_fanned_out(self):
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 13
+        )
+
+    def test_feed_merges_popular_authors(self):
+        texts, last = self.read_all(self.client)
+        self.assertEqual(texts, [f"пост {i}" for i in reversed(range(25))])
+
+        previous = self.client.get(
+            reverse("posts:follow_index"),
+            {"before": last.context["page_obj"].previous_cursor},
+        )
+        self.assertEqual(
+            [post.text for post in previous.context["page_obj"]],
+            [f"пост {i}" for i in reversed(range(5, 15))],
+        )
+
+    def test_entries_and_merge_do_not_duplicate(self):
+        # Пост автора, разложенный до того, как тот стал популярным.
+        post = Post.objects.filter(author=self.star).latest("pub_date")
+        TimelineEntry.objects.create(
+            user=self.reader, post=post, pub_date=post.pub_date
+        )
+        texts, _ = self.read_all(self.client)
+        self.assertEqual(len(texts), len(set(texts)))
+        self.assertEqual(len(texts), 25)
+
+    def test_dropping_below_threshold_backfills(self):
+        Follow.objects.filter(user=self.fan).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=self.reader, post__author=self.star
+            ).count(),
+            12,
+        )
+        texts, _ = self.read_all(self.client)
+        self.assertEqual(texts, [f"пост {i}" for i in reversed(range(25))])
+
+    def test_query_count_does_not_depend_on_feed_size(self):
+        url = reverse("posts:follow_index")
+        after = self.client.get(url).context["page_obj"].next_cursor
+        # Сессия и пользователь, популярные подписки, страница ленты,
+        # посты популярных авторов.
+        for query in ({}, {"after": after}):
+            with self.subTest(query=query):
+                with self.assertNumQueries(5):
+                    self.client.get(url, query)
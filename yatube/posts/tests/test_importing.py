@@ -0,0 +1,198 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..exports import export_chunks
+from ..importing import write_batch
+from ..models import (
+    Comment, Follow, Group, ImportCheckpoint, Post, TimelineEntry,
+)
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class ImportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("auth")
+        cls.reader = User.objects.create_user("reader")
+        cls.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            file.write(content)
+        return path
+
+    def jsonl(self, name, rows):
+        return self.write(name, "".join(
+            json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+        ))
+
+    def run_import(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_data", *args, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_posts_and_reports_bad_rows(self):
+        path = self.jsonl("posts.jsonl", [
+            {
+                "text": "старый пост", "author": "auth", "group": "slug",
+                "pub_date": "2015-03-01T12:00:00+00:00",
+            },
+            {"text": "без группы", "author": "reader"},
+            {"text": "", "author": "auth"},
+            {"text": "чужой", "author": "nobody"},
+            {"text": "не та группа", "author": "auth", "group": "missing"},
+        ])
+        with open(path, "a", encoding="utf-8") as file:
+            file.write("{не json\n")
+        stdout, stderr = self.run_import("posts", path, batch_size=2)
+
+        self.assertEqual(Post.objects.count(), 2)
+        old = Post.objects.get(text="старый пост")
+        self.assertEqual(
+            old.pub_date,
+            datetime.datetime(2015, 3, 1, 12, tzinfo=datetime.timezone.utc),
+        )
+        self.assertEqual(old.updated, old.pub_date)
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(
+            [line.split(":")[0] for line in stderr.splitlines()],
+            ["строка 3", "строка 4", "строка 5", "строка 6"],
+        )
+        self.assertIn("загружено 2, пропущено 4", stdout)
+        self.assertIn("строк/с", stdout)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        # Счётчики пересчитаны, посты проиндексированы триггерами.
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(self.author.post_stats.post_count, 1)
+        self.assertEqual(
+            list(search_posts(Post.objects.all(), "старый")), [old]
+        )
+
+    def test_round_trip_through_export_keeps_ids(self):
+        posts = [
+            Post.objects.create(author=self.author, text=f"пост, \"{n}\"")
+            for n in range(3)
+        ]
+        comment = Comment.objects.create(
+            post=posts[0], author=self.reader, text="комментарий"
+        )
+        exported = {
+            table: self.write(
+                f"{table}.csv", "".join(export_chunks(table, "csv"))
+            )
+            for table in ("posts", "comments")
+        }
+        Post.objects.all().delete()
+
+        self.run_import("posts", exported["posts"])
+        self.run_import("comments", exported["comments"])
+        self.assertEqual(
+            list(Post.objects.order_by("pk").values_list("pk", "text")),
+            [(post.pk, post.text) for post in posts],
+        )
+        self.assertEqual(Comment.objects.get().pk, comment.pk)
+        self.assertEqual(Post.objects.get(pk=posts[0].pk).comment_count, 1)
+
+        # Повторная загрузка не создаёт дублей.
+        _, stderr = self.run_import("posts", exported["posts"])
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn(f"id {posts[0].pk} уже занят", stderr)
+
+    def test_comments_need_existing_posts(self):
+        post = Post.objects.create(author=self.author, text="пост")
+        path = self.jsonl("comments.jsonl", [
+            {"post_id": post.pk, "author": "reader", "text": "да"},
+            {"post_id": 999, "author": "reader", "text": "нет"},
+        ])
+        _, stderr = self.run_import("comments", path)
+        self.assertEqual(Comment.objects.get().text, "да")
+        self.assertIn("нет поста 999", stderr)
+
+    def test_resumes_from_checkpoint(self):
+        path = self.jsonl("posts.jsonl", [
+            {"text": f"пост {number}", "author": "auth"}
+            for number in range(5)
+        ])
+        ImportCheckpoint.objects.create(
+            source=os.path.abspath(path), table="posts", done=3, imported=3,
+        )
+        stdout, _ = self.run_import("posts", path)
+        self.assertEqual(
+            sorted(Post.objects.values_list("text", flat=True)),
+            ["пост 3", "пост 4"],
+        )
+        self.assertIn("3 строк уже обработано", stdout)
+        self.assertIn("загружено 5", stdout)
+
+        ImportCheckpoint.objects.create(
+            source="comments", table="comments", done=1
+        )
+        with self.assertRaises(CommandError):
+            self.run_import("posts", path, checkpoint="comments")
+
+    def test_checkpoint_commits_with_its_batch(self):
+        path = self.jsonl("posts.jsonl", [
+            {"text": f"пост {number}", "author": "auth"}
+            for number in range(5)
+        ])
+        calls = []
+
+        def crash_on_second_batch(name, rows):
+            calls.append(rows)
+            write_batch(name, rows)
+            if len(calls) == 2:
+                raise RuntimeError("сбой")
+
+        with mock.patch(
+            "posts.management.commands.import_data.write_batch",
+            crash_on_second_batch,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import("posts", path, batch_size=2)
+        # Вторая пачка откатилась вместе со своей контрольной точкой.
+        self.assertEqual(ImportCheckpoint.objects.get().done, 2)
+        self.assertEqual(Post.objects.count(), 2)
+
+        self.run_import("posts", path, batch_size=2)
+        self.assertEqual(
+            sorted(Post.objects.values_list("text", flat=True)),
+            [f"пост {number}" for number in range(5)],
+        )
+
+    def test_imported_posts_reach_follower_timelines(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.jsonl("posts.jsonl", [
+            {
+                "text": "из архива", "author": "auth",
+                "pub_date": (
+                    timezone.now() - datetime.timedelta(days=1)
+                ).isoformat(),
+            },
+        ])
+        self.run_import("posts", path)
+        self.assertEqual(
+            TimelineEntry.objects.get(user=self.reader).post.text,
+            "из архива",
+        )
@@ -1,7 +1,14 @@
+from io import StringIO
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from ..models import Post, Group
+from ..models import AuthorStats, Comment, Post, Group
 
 User = get_user_model()
 
@@ -20,3 +27,133 @@ class PostModelTest(TestCase):
         """У моделей метод __str__ выводит первые 15 символов."""
         group = Group.objects.create(slug="slug", title='title')
         self.assertEqual(str(group), 'title')
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN из SQLite")
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class FeedIndexesTest(TestCase):
+    """Запросы лент и комментариев идут по составным индексам,
+    а не сортируют всю выборку (USE TEMP B-TREE FOR ORDER BY)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("auth")
+        cls.group = Group.objects.create(slug="slug", title="title")
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text="пост"
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text="текст")
+
+    def query_plans(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query["sql"]
+                if f'FROM "{table}"' in sql and "ORDER BY" in sql:
+                    cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                    plans.append(" ".join(row[-1] for row in cursor))
+        return plans
+
+    def test_view_queries_use_indexes(self):
+        # Лента группы и автора - страница постов по pub_date и MAX(updated)
+        # для ETag (posts.conditional).
+        cases = [
+            (reverse("posts:index"), "posts_post", ["post_pub_date_idx"]),
+            (
+                reverse("posts:group_list", kwargs={"slug": "slug"}),
+                "posts_post",
+                ["post_group_pub_date_idx", "post_group_updated_idx"],
+            ),
+            (
+                reverse("posts:profile", kwargs={"username": "auth"}),
+                "posts_post",
+                ["post_author_pub_date_idx", "post_author_updated_idx"],
+            ),
+            (
+                reverse("posts:post_detail", kwargs={"post_id": self.post.id}),
+                "posts_comment",
+                ["comment_post_created_id_idx"],
+            ),
+        ]
+        for url, table, indexes in cases:
+            with self.subTest(url=url):
+                plans = self.query_plans(url, table)
+                self.assertTrue(plans)
+                for plan in plans:
+                    self.assertTrue(
+                        any(index in plan for index in indexes), plan
+                    )
+                    self.assertNotIn("TEMP B-TREE", plan)
+                for index in indexes:
+                    self.assertTrue(
+                        any(index in plan for plan in plans), index
+                    )
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("auth")
+        self.other = User.objects.create_user("other")
+        self.group = Group.objects.create(slug="slug", title="title")
+        self.group_2 = Group.objects.create(slug="slug_2", title="title 2")
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text="пост"
+        )
+
+    def assertCounters(self, author_posts, group_posts, group_2_posts):
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).post_count,
+            author_posts,
+        )
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group.post_count, group_posts)
+        self.assertEqual(self.group_2.post_count, group_2_posts)
+
+    def test_post_create_edit_and_delete(self):
+        self.assertCounters(1, 1, 0)
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.group_2
+        post.save()
+        self.assertCounters(1, 0, 1)
+
+        post.text = "новый текст"
+        post.save()
+        self.assertCounters(1, 0, 1)
+
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_comment_count_and_cascade_delete(self):
+        for author in (self.user, self.other, self.other):
+            Comment.objects.create(post=self.post, author=author, text="к")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+
+        self.other.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        self.user.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+
+    def test_edit_does_not_overwrite_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user, text="к")
+        stale.text = "правка"
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_rebuild_counters_command(self):
+        Post.objects.bulk_create([
+            Post(author=self.other, group=self.group_2, text="без сигналов"),
+        ])
+        Group.objects.update(post_count=42)
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertCounters(1, 1, 1)
+        self.assertEqual(self.other.post_stats.post_count, 1)
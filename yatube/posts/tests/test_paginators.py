@@ -0,0 +1,129 @@
+from core.templatetags.pagination import page_window
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..paginators import CursorPage, CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    POSTS_COUNT = 25
+    PER_PAGE = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("auth")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"пост {i}")
+            for i in range(cls.POSTS_COUNT)
+        )
+        cls.expected = list(Post.objects.order_by("-pub_date", "-id"))
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), self.PER_PAGE)
+
+    def test_walks_forward_and_back_through_all_posts(self):
+        """Ссылки after/before обходят ленту без пропусков и повторов."""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(
+                self.paginator.get_page(after=pages[-1].next_cursor)
+            )
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(
+            [post for page in pages for post in page], self.expected
+        )
+        self.assertFalse(pages[0].has_previous())
+
+        back = self.paginator.get_page(before=pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        back = self.paginator.get_page(before=back.previous_cursor)
+        self.assertEqual(list(back), list(pages[0]))
+        self.assertFalse(back.has_previous())
+
+    def test_new_posts_do_not_shift_next_page(self):
+        first = self.paginator.get_page()
+        Post.objects.create(author=self.user, text="свежий пост")
+        second = self.paginator.get_page(after=first.next_cursor)
+        self.assertEqual(list(second), self.expected[10:20])
+
+    def test_broken_cursor_returns_first_page(self):
+        for token in ("мусор", "bm90LWpzb24", "WyJ4IiwxXQ"):
+            with self.subTest(token=token):
+                page = self.paginator.get_page(after=token)
+                self.assertEqual(list(page), self.expected[:10])
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True, POSTS_PAGE_CACHE_TIMEOUT=0)
+class CursorPaginationViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("auth")
+        cls.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f"пост {i}")
+            for i in range(12)
+        )
+
+    def test_feeds_use_cursor_pages_without_offset(self):
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.user.username}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                page_obj = response.context["page_obj"]
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), 10)
+                self.assertContains(
+                    response, f"?after={page_obj.next_cursor}"
+                )
+                sql = [query["sql"] for query in queries.captured_queries]
+                self.assertTrue(any("LIMIT 11" in query for query in sql))
+                self.assertFalse(any("OFFSET" in query for query in sql))
+
+                response = self.client.get(
+                    url, {"after": page_obj.next_cursor}
+                )
+                self.assertEqual(len(response.context["page_obj"]), 2)
+
+
+class PageWindowTest(TestCase):
+    def window(self, number, num_pages):
+        paginator = Paginator(range(num_pages * 10), 10)
+        return page_window(paginator.page(number))
+
+    def test_window_around_current_page(self):
+        cases = [
+            (1, 1, [1]),
+            (1, 5, [1, 2, 3, 4, 5]),
+            (1, 20000, [1, 2, 3, None, 20000]),
+            (10, 20000, [1, None, 8, 9, 10, 11, 12, None, 20000]),
+            (4, 20000, [1, 2, 3, 4, 5, 6, None, 20000]),
+            (20000, 20000, [1, None, 19998, 19999, 20000]),
+        ]
+        for number, num_pages, expected in cases:
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(self.window(number, num_pages), expected)
+
+    def test_paginator_template_renders_bounded_links(self):
+        paginator = Paginator(range(200000), 10)
+        html = render_to_string(
+            "posts/includes/paginator.html",
+            {"page_obj": paginator.page(500)},
+        )
+        self.assertEqual(html.count('class="page-item'), 13)
+        self.assertIn("?page=20000", html)
+        self.assertIn("&hellip;", html)
@@ -0,0 +1,75 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SQLiteFTSBackend, search_posts
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == "sqlite", "индекс FTS5 есть только в SQLite")
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("auth")
+        self.rare = Post.objects.create(
+            author=self.user, text="Толстой пишет о войне и мире"
+        )
+        self.frequent = Post.objects.create(
+            author=self.user, text="Толстой, Толстой и снова Толстой"
+        )
+        Post.objects.create(author=self.user, text="Пост про котиков")
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_results_ranked_by_relevance(self):
+        self.assertEqual(self.search("толстой"), [self.frequent, self.rare])
+        self.assertEqual(self.search("толст мир"), [self.rare])
+        self.assertEqual(self.search('"; DROP'), [])
+
+    def test_index_follows_edits_deletes_and_bulk_inserts(self):
+        self.rare.text = "Чехов"
+        self.rare.save()
+        self.assertEqual(self.search("чехов"), [self.rare])
+        self.assertEqual(self.search("войне"), [])
+
+        self.frequent.delete()
+        self.assertEqual(self.search("толстой"), [])
+
+        Post.objects.bulk_create([Post(author=self.user, text="Гоголь")])
+        self.assertEqual(len(self.search("гоголь")), 1)
+
+    def test_install_restores_lost_triggers(self):
+        backend = SQLiteFTSBackend()
+        with connection.cursor() as cursor:
+            for name in backend.triggers:
+                cursor.execute(f"DROP TRIGGER {name}")
+        Post.objects.create(author=self.user, text="Пушкин")
+        backend.install(connection)
+        self.assertEqual(len(self.search("пушкин")), 1)
+        self.rare.delete()
+        self.assertEqual(self.search("войне"), [])
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_search_page_keeps_query_in_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Толстой {i}") for i in range(12)
+        )
+        response = self.client.get(reverse("posts:search"), {"q": "Толстой"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+        self.assertContains(response, "?q=%D0%A2%D0%BE%D0%BB")
+        self.assertContains(response, "&amp;page=2")
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser("admin", "a@a.ru", "password")
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse("admin:posts_post_changelist"), {"q": "толстой"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 2)
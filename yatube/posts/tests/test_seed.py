@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F, Max, Min
+from django.test import TestCase
+
+from ..models import Comment, Group, Post
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class SeedDataTest(TestCase):
+    def seed(self, **options):
+        last_post = Post.objects.order_by("-pk").first()
+        last_user = User.objects.order_by("-pk").first()
+        call_command(
+            "seed_data", users=5, groups=2, posts=30, comments=20,
+            chunk_size=7, stdout=StringIO(), **options
+        )
+        posts = Post.objects.order_by("pk")
+        if last_post:
+            posts = posts.filter(pk__gt=last_post.pk)
+        first_author = User.objects.filter(
+            pk__gt=last_user.pk if last_user else 0
+        ).order_by("pk")[0].pk
+        return [
+            (
+                post.text, post.author_id - first_author,
+                post.group_id is None, post.pub_date,
+            )
+            for post in posts
+        ]
+
+    def test_fills_database_and_counters(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+
+        dates = list(Post.objects.order_by("pk").values_list("pub_date"))
+        self.assertEqual(dates, sorted(dates))
+        post = Post.objects.order_by("-comment_count")[0]
+        self.assertEqual(post.comment_count, post.comments.count())
+        self.assertEqual(post.author.post_stats.post_count,
+                         post.author.posts.count())
+        word = post.text.split()[0]
+        self.assertIn(post, search_posts(Post.objects.all(), word))
+
+    def test_comments_are_newer_than_their_posts(self):
+        call_command(
+            "seed_data", users=5, groups=2, posts=30, comments=300,
+            start="2020-03-01", days=3, stdout=StringIO(),
+        )
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F("post__pub_date")).exists()
+        )
+        self.assertFalse(
+            Comment.objects.filter(created__gte="2020-03-04").exists()
+        )
+
+    def test_same_seed_gives_same_data_for_any_workers(self):
+        inline = self.seed(seed=7, workers=1)
+        pooled = self.seed(seed=7, workers=2)
+        self.assertEqual(inline, pooled)
+        self.assertNotEqual(inline, self.seed(seed=8, workers=1))
+
+    def test_start_sets_publication_period(self):
+        self.seed(start="2020-03-01", days=10)
+        dates = Post.objects.aggregate(
+            first=Min("pub_date"), last=Max("pub_date")
+        )
+        self.assertGreaterEqual(dates["first"].isoformat(), "2020-03-01")
+        self.assertLess(dates["last"].isoformat(), "2020-03-11")
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from ..models import Post
+from ..thumbnails import generate_thumbnails
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+THUMBNAILS_ROOT = os.path.join(TEMP_MEDIA_ROOT, "cache")
+
+
+def make_image(name="small.png"):
+    buffer = BytesIO()
+    Image.new("RGB", (400, 300), "lightskyblue").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(THUMBNAILS_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user("auth")
+
+    def thumbnail_files(self):
+        return [
+            name
+            for _, _, files in os.walk(THUMBNAILS_ROOT)
+            for name in files
+        ]
+
+    def test_new_image_schedules_thumbnails_once(self):
+        with mock.patch("posts.signals.schedule_thumbnails") as schedule:
+            post = Post.objects.create(
+                author=self.user, text="пост", image=make_image()
+            )
+            post.text = "правка без новой картинки"
+            post.save()
+            Post.objects.create(author=self.user, text="без картинки")
+        schedule.assert_called_once_with(post)
+
+    def test_generates_every_configured_geometry(self):
+        post = Post.objects.create(
+            author=self.user, text="пост", image=make_image()
+        )
+        self.assertEqual(generate_thumbnails(post.image.name), 2)
+        self.assertEqual(len(self.thumbnail_files()), 2)
+
+    @mock.patch("posts.thumbnails.time.sleep")
+    def test_failed_geometry_is_retried(self, sleep):
+        with mock.patch(
+            "posts.thumbnails.get_thumbnail",
+            side_effect=[OSError("диск занят"), None, None],
+        ) as get_thumbnail:
+            self.assertEqual(generate_thumbnails("posts/small.png"), 2)
+        self.assertEqual(get_thumbnail.call_count, 3)
+        sleep.assert_called_once()
+
+    def test_backfill_command(self):
+        with mock.patch("posts.signals.schedule_thumbnails"):
+            for name in ("one.png", "two.png"):
+                Post.objects.create(
+                    author=self.user, text="пост", image=make_image(name)
+                )
+        out = StringIO()
+        call_command("pregenerate_thumbnails", workers=1, stdout=out)
+        self.assertIn("миниатюр: 4", out.getvalue())
+        self.assertEqual(len(self.thumbnail_files()), 4)
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_feed_resolves_card_thumbnails_in_one_query(self):
+        posts = [
+            Post.objects.create(
+                author=self.user, text="пост", image=make_image(f"{i}.png")
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            generate_thumbnails(post.image.name)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("posts:index"))
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if "thumbnail_kvstore" in query["sql"]
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for post in response.context["page_obj"]:
+            expected = get_thumbnail(post.image, "100x100", crop="center")
+            self.assertEqual(post.card_thumbnail.url, expected.url)
+            self.assertContains(response, expected.url)
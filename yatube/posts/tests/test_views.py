@@ -1,13 +1,17 @@
+import shutil
+import tempfile
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from ..forms import PostForm
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post
 
 User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
 
 class PostPageTests(TestCase):
@@ -269,7 +273,13 @@ class PaginatorViewsTest(TestCase):
         )
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class ImagePostPageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         self.user = User.objects.create_user("auth")
         self.group = Group.objects.create(
@@ -333,3 +343,102 @@ class ImagePostPageTests(TestCase):
         post = response.context["post"]
 
         self.assertEqual(post.image, self.post.image)
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class FeedQueriesTest(TestCase):
+    """Число запросов страницы не зависит от числа постов и комментариев:
+    авторы и группы подгружаются одним JOIN, а не по запросу на строку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title="группа", slug="slug", description="описание"
+        )
+        cls.author = User.objects.create_user("author")
+        for i in range(10):
+            user = User.objects.create_user(f"user_{i}")
+            post = Post.objects.create(
+                author=cls.author if i % 2 else user,
+                group=cls.group,
+                text=f"пост {i}",
+            )
+            Comment.objects.create(post=post, author=user, text="текст")
+        cls.post = post
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f"user_{i}"),
+                text=f"комментарий {i}",
+            )
+
+    def test_views_query_count(self):
+        cases = [
+            # COUNT для паджинатора + страница постов
+            (reverse("posts:index"), 2),
+            # группа со счётчиком + страница
+            (reverse("posts:group_list", kwargs={"slug": "slug"}), 2),
+            # автор со счётчиком + страница
+            (reverse("posts:profile", kwargs={"username": "author"}), 2),
+            # пост со счётчиком автора + комментарии
+            (
+                reverse("posts:post_detail", kwargs={"post_id": self.post.id}),
+                2,
+            ),
+        ]
+        for url, queries in cases:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=5, POSTS_PAGE_CACHE_TIMEOUT=0)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("auth")
+        cls.post = Post.objects.create(author=cls.author, text="пост")
+        for i in range(12):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"комментарий {i}"
+            )
+
+    def texts(self, response):
+        return [comment.text for comment in response.context["comments"]]
+
+    def test_post_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        )
+        self.assertEqual(
+            self.texts(response), [f"комментарий {i}" for i in range(5)]
+        )
+        self.assertContains(response, "Показать ещё")
+
+    def test_comments_endpoint_loads_next_batches(self):
+        url = reverse("posts:post_comments", kwargs={"post_id": self.post.id})
+        texts, after = [], ""
+        for _ in range(3):
+            response = self.client.get(url, {"after": after})
+            self.assertTemplateUsed(response, "posts/includes/comments.html")
+            self.assertTemplateNotUsed(response, "base.html")
+            texts += self.texts(response)
+            after = response.context["comments"].next_cursor
+        self.assertEqual(texts, [f"комментарий {i}" for i in range(12)])
+        self.assertIsNone(after)
+        self.assertNotContains(response, "Показать ещё")
+
+    def test_comments_endpoint_missing_post(self):
+        response = self.client.get(
+            reverse("posts:post_comments", kwargs={"post_id": 999})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_count_does_not_depend_on_page(self):
+        url = reverse("posts:post_comments", kwargs={"post_id": self.post.id})
+        after = self.client.get(url).context["comments"].next_cursor
+        # Пост существует + страница комментариев с авторами.
+        for query in ({}, {"after": after}):
+            with self.subTest(query=query):
+                with self.assertNumQueries(2):
+                    self.client.get(url, query)
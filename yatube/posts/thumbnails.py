@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Картинки, уже стоящие в очереди: повторное сохранение поста не должно
+# ставить второй такой же ресайз.
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def generate_thumbnails(image_name):
+    """Создаёт все миниатюры из `POSTS_THUMBNAILS` для картинки.
+
+    Каждая геометрия повторяется до `POSTS_THUMBNAIL_RETRIES` раз с
+    экспоненциальной паузой. Возвращает число созданных миниатюр.
+    """
+    created = 0
+    try:
+        for geometry, options in settings.POSTS_THUMBNAILS:
+            for attempt in range(1, settings.POSTS_THUMBNAIL_RETRIES + 1):
+                try:
+                    get_thumbnail(image_name, geometry, **options)
+                except Exception:
+                    if attempt == settings.POSTS_THUMBNAIL_RETRIES:
+                        logger.exception(
+                            "Не удалось создать миниатюру %s для %s",
+                            geometry,
+                            image_name,
+                        )
+                        break
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+                else:
+                    created += 1
+                    break
+    finally:
+        with _pending_lock:
+            _pending.discard(image_name)
+        # Рабочий поток живёт дольше запроса: соединение с БД, открытое
+        # хранилищем ключей sorl, закрываем сами.
+        close_old_connections()
+    return created
+
+
+def enqueue_thumbnails(image_name):
+    """Ставит картинку в очередь пула; при `POSTS_THUMBNAIL_WORKERS = 0`
+    миниатюры создаются сразу в текущем потоке."""
+    with _pending_lock:
+        if image_name in _pending:
+            return None
+        _pending.add(image_name)
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        return generate_thumbnails(image_name)
+    return _get_executor().submit(generate_thumbnails, image_name)
+
+
+def schedule_thumbnails(post):
+    """Запускает генерацию миниатюр после фиксации транзакции, чтобы
+    воркер не опередил запись поста и файла."""
+    image_name = post.image.name
+    if image_name:
+        transaction.on_commit(lambda: enqueue_thumbnails(image_name))
+
+
+def thumbnail_name(image, geometry, options):
+    """Имя файла миниатюры - так же, как его считает
+    `ThumbnailBackend.get_thumbnail`, но без обращения к хранилищу."""
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def _get_many_raw(keys):
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if not isinstance(values.get(key), str)]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list("key", "value")
+        )
+        kvstore.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return values
+
+
+def prefetch_thumbnails(posts, geometry, attr):
+    """Находит готовые миниатюры `geometry` для всех постов страницы
+    одним запросом к хранилищу ключей sorl и кладёт их в `post.<attr>`.
+
+    Посты, для которых миниатюры ещё нет, остаются без атрибута -
+    их отрисует обычный тег `{% thumbnail %}`.
+    """
+    options = dict(settings.POSTS_THUMBNAILS)[geometry]
+    keys = [
+        (
+            post,
+            add_prefix(
+                ImageFile(
+                    thumbnail_name(post.image, geometry, options),
+                    default.storage,
+                ).key
+            ),
+        )
+        for post in posts
+        if post.image
+    ]
+    if not keys:
+        return
+    values = _get_many_raw({key for _, key in keys})
+    for post, key in keys:
+        value = values.get(key)
+        if isinstance(value, str):
+            setattr(post, attr, deserialize_image_file(value))
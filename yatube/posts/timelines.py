@@ -0,0 +1,141 @@
+"""Лента подписок: посты авторов, на которых подписан пользователь.
+
+Лента строится при записи (fan-out on write): новый пост сразу
+раскладывается записями TimelineEntry по лентам всех подписчиков автора,
+и страница ленты читается по индексу одной таблицы, сколько бы авторов
+ни было в подписках.
+
+Посты авторов с большим числом подписчиков
+(POSTS_FANOUT_MAX_FOLLOWERS и больше) не раскладываются - одна
+публикация стоила бы сотни тысяч вставок. Они добавляются в ленту при
+чтении: отдельным keyset-запросом по этим авторам, который сливается со
+страницей из TimelineEntry (posts.paginators.MergedCursorPaginator).
+"""
+import itertools
+
+from django.conf import settings
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator, MergedCursorPaginator
+
+# Сколько последних постов автора попадает в ленту при подписке.
+BACKFILL_POSTS = 50
+# Записей ленты в одном INSERT.
+BATCH_SIZE = 500
+
+
+def fans_out(author_id):
+    """Раскладываются ли посты автора по лентам при публикации."""
+    return not AuthorStats.objects.filter(
+        author_id=author_id,
+        follower_count__gte=settings.POSTS_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def _add_entries(rows):
+    """Вставляет записи ленты (user_id, post_id, pub_date) пачками;
+    уже существующие пропускаются. Возвращает число строк."""
+    count = 0
+    batch = []
+    for user_id, post_id, pub_date in rows:
+        batch.append(TimelineEntry(
+            user_id=user_id, post_id=post_id, pub_date=pub_date
+        ))
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            count += len(batch)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return count + len(batch)
+
+
+def fan_out(post):
+    """Добавляет пост в ленты подписчиков автора; возвращает число
+    подписчиков, до которых он разложен."""
+    # Проверка порога - в том же запросе, что и выборка подписчиков:
+    # у популярного автора он просто ничего не вернёт.
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+        author__post_stats__follower_count__lt=(
+            settings.POSTS_FANOUT_MAX_FOLLOWERS
+        ),
+    ).values_list("user_id", flat=True)
+    return _add_entries(
+        (user_id, post.pk, post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_ids, author_id):
+    """Добавляет последние BACKFILL_POSTS постов автора в ленты
+    `user_ids` - при подписке и когда автор перестаёт быть слишком
+    популярным для раскладки."""
+    if not fans_out(author_id):
+        return 0
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("pk", "pub_date")[:BACKFILL_POSTS]
+    )
+    return _add_entries(
+        (user_id, pk, pub_date)
+        for user_id in user_ids
+        for pk, pub_date in posts
+    )
+
+
+def backfill_authors(author_ids=None):
+    """Добавляет последние посты авторов `author_ids` (без него - всех)
+    в ленты их подписчиков - после массовой загрузки, которая идёт мимо
+    сигналов. Возвращает число добавленных записей."""
+    follows = (
+        Follow.objects.order_by("author_id")
+        .values_list("author_id", "user_id")
+        .iterator()
+    )
+    count = 0
+    for author_id, rows in itertools.groupby(follows, lambda row: row[0]):
+        if author_ids is None or author_id in author_ids:
+            count += backfill([user_id for _, user_id in rows], author_id)
+    return count
+
+
+def remove_author(user_id, author_id):
+    """Убирает посты автора из ленты при отписке."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def timeline_page(user, per_page, after=None, before=None):
+    """Страница ленты подписок: CursorPage с постами, авторы и группы
+    подгружены."""
+    popular = list(
+        Follow.objects.filter(
+            user=user,
+            author__post_stats__follower_count__gte=(
+                settings.POSTS_FANOUT_MAX_FOLLOWERS
+            ),
+        ).values_list("author_id", flat=True)
+    )
+    entries = CursorPaginator(
+        TimelineEntry.objects.filter(user=user).select_related(
+            "post__author", "post__group"
+        ),
+        per_page,
+        ordering=("-pub_date", "-post_id"),
+    )
+    if not popular:
+        page = entries.get_page(after=after, before=before)
+        page.object_list = [entry.post for entry in page.object_list]
+        return page
+    merged = Post.objects.filter(author_id__in=popular).select_related(
+        "author", "group"
+    )
+    return MergedCursorPaginator(
+        [
+            (entries, lambda entry: entry.post),
+            (CursorPaginator(merged, per_page), lambda post: post),
+        ],
+        per_page,
+    ).get_page(after=after, before=before)
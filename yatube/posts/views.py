@@ -1,33 +1,109 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, get_object_or_404
 from posts.forms import PostForm
-from .models import Group, Post, User, Comment
+from .models import Follow, Post, Comment, User
+from .cache import (
+    cache_anonymous_page, page_cache_stats, page_depends_on, post_card_key,
+)
+from .conditional import (
+    author_state, conditional_page, get_page_object_or_404, group_state,
+    load_author, load_group, load_post, post_state,
+)
+from .paginators import CursorPaginator
+from .search import search_posts
+from .thumbnails import prefetch_thumbnails
+from .timelines import timeline_page
 from django.core.paginator import Paginator
 from django.shortcuts import redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.http import Http404, JsonResponse
 from .forms import CommentForm
 
 
-def paginator(request, posts):
-    SELECT_LIMIT = 10
-    paginator = Paginator(posts.order_by("-pub_date"), SELECT_LIMIT)
+SELECT_LIMIT = 10
+
+
+def paginator(request, posts, count=None):
+    if settings.POSTS_CURSOR_PAGINATION:
+        return CursorPaginator(posts, SELECT_LIMIT).get_page(
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+    paginator = Paginator(posts.order_by("-pub_date", "-id"), SELECT_LIMIT)
+    if count is not None:
+        # Счётчик уже известен - обходимся без COUNT(*).
+        paginator.count = count
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def depends_on_posts(request, posts):
+    """Карточки выводят имя и адрес автора и группу поста: страница
+    устаревает вместе с ними (posts.cache.page_depends_on)."""
+    page_depends_on(
+        request,
+        *(("author", post.author_id) for post in posts),
+        *(("group-info", post.group_id) for post in posts if post.group_id),
+    )
+
+
+def prefetch_card_thumbnails(posts):
+    """Миниатюры карточек одним запросом - только для карточек, которых
+    нет в кэше фрагментов: закэшированная карточка их не выводит."""
+    keys = {post_card_key(post): post for post in posts}
+    cached = cache.get_many(list(keys))
+    prefetch_thumbnails(
+        [post for key, post in keys.items() if key not in cached],
+        "100x100", "card_thumbnail",
+    )
+
+
+def feed_page(request, posts, count=None):
+    """Страница ленты с миниатюрами карточек, найденными одним запросом."""
+    page_obj = paginator(request, posts, count)
+    prefetch_card_thumbnails(page_obj)
+    depends_on_posts(request, page_obj)
+    return page_obj
+
+
+def comment_page(request, post_id):
+    """Страница комментариев поста от старых к новым.
+
+    Keyset по (created, id) идёт по индексу comment_post_created_id_idx,
+    поэтому первая и любая следующая страница читают только свои
+    POSTS_COMMENTS_PER_PAGE строк, сколько бы комментариев ни было."""
+    return CursorPaginator(
+        Comment.objects.filter(post=post_id).select_related("author"),
+        settings.POSTS_COMMENTS_PER_PAGE,
+        ordering=("created", "id"),
+    ).get_page(after=request.GET.get("after"))
+
+
+def author_post_count(author):
+    stats = getattr(author, "post_stats", None)
+    return stats.post_count if stats else 0
+
+
+@cache_anonymous_page(lambda: ("index",))
 def index(request):
-    post_list = Post.objects.all().order_by("-pub_date")
-    page_obj = paginator(request, post_list)
+    post_list = Post.objects.select_related("author", "group")
+    page_obj = feed_page(request, post_list)
     context = {
         "page_obj": page_obj,
     }
     return render(request, "posts/index.html", context)
 
 
+@cache_anonymous_page(lambda slug: ("group", slug))
+@conditional_page(load_group, group_state)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
-    page_obj = paginator(request, post_list)
+    group = get_page_object_or_404(request, load_group, slug=slug)
+    post_list = group.posts.select_related("author", "group")
+    page_obj = feed_page(request, post_list, group.post_count)
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -46,27 +122,37 @@ def group_posts(request, slug):
 #     return render(request, template, context)
 
 
+@cache_anonymous_page(lambda username: ("profile", username))
+@conditional_page(load_author, author_state)
 def profile(request, username):
-    author = User.objects.get(username__exact=username)
-    post_list = author.posts.order_by("-pub_date")
-    post_count = post_list.count()
-    page_obj = paginator(request, post_list)
+    author = get_page_object_or_404(request, load_author, username=username)
+    post_list = author.posts.select_related("author", "group")
+    post_count = author_post_count(author)
+    page_obj = feed_page(request, post_list, post_count)
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         "page_obj": page_obj,
         "full_name": author,
-        "post_count": post_count
+        "post_count": post_count,
+        "following": following,
     }
     return render(request, "posts/profile.html", context)
 
 
+@cache_anonymous_page(lambda post_id: ("post", post_id))
+@conditional_page(load_post, post_state)
 def post_detail(request, post_id):
     # post = get_object_or_404(Post, pk=post_id)
     # posts = Post.objects.filter(author=post.author)
     # post_count = posts.count()
-    post = get_object_or_404(Post, pk=post_id)
-    posts = Post.objects.filter(author=post.author)
-    post_count = posts.count()
-    comments = Comment.objects.filter(post=post_id)
+    post = get_page_object_or_404(request, load_post, post_id=post_id)
+    post_count = author_post_count(post.author)
+    depends_on_posts(request, [post])
+    comments = comment_page(request, post_id)
     if request.method == 'POST':
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -86,6 +172,36 @@ def post_detail(request, post_id):
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев для подгрузки на странице поста:
+    HTML-фрагмент со ссылкой на порцию после неё."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        "post_id": post_id,
+        "comments": comment_page(request, post_id),
+    }
+    return render(request, "posts/includes/comments.html", context)
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    post_list = Post.objects.none()
+    if query:
+        post_list = search_posts(
+            Post.objects.select_related("author", "group"), query
+        )
+    page_obj = Paginator(post_list, SELECT_LIMIT).get_page(
+        request.GET.get("page")
+    )
+    prefetch_card_thumbnails(page_obj)
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def create_post(request):
     if request.method == "POST":
@@ -137,3 +253,41 @@ def add_comment(request, post_id):
         comment.post = post
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def follow_index(request):
+    """Лента постов авторов, на которых подписан пользователь."""
+    page_obj = timeline_page(
+        request.user,
+        SELECT_LIMIT,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    prefetch_card_thumbnails(page_obj)
+    return render(request, "posts/follow.html", {"page_obj": page_obj})
+
+
+@require_POST
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        if not Follow.objects.filter(
+            user=request.user, author=author
+        ).exists():
+            Follow.objects.create(user=request.user, author=author)
+    return redirect("posts:profile", username=username)
+
+
+@require_POST
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect("posts:profile", username=username)
+
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse(page_cache_stats())
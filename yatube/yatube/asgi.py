@@ -0,0 +1,25 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Запуск, например: ``uvicorn yatube.asgi:application`` из каталога yatube.
+На Django 3.0+ это родное ASGI-приложение. На Django 2.2 WSGI-приложение
+выполняется через core.asgi.ThreadedWsgiToAsgi - по потоку пула на
+запрос.
+"""
+
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError:
+    from django.core.wsgi import get_wsgi_application
+
+    from core.asgi import ThreadedWsgiToAsgi
+
+    application = ThreadedWsgiToAsgi(get_wsgi_application())
+else:
+    application = get_asgi_application()
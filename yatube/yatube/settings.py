@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "core.apps.CoreConfig",
     "users.apps.UsersConfig",
     "posts.apps.PostsConfig",
+    "api.apps.ApiConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -47,6 +48,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Статика из STATIC_ROOT с заранее сжатыми вариантами; только при
+    # DEBUG = False.
+    "core.middleware.StaticFilesMiddleware",
+    # Метрики запросов для /internal/metrics/; первым, чтобы учитывать
+    # время остальных middleware.
+    "core.middleware.MetricsMiddleware",
+    # Чтение с реплик и read-your-writes; только при DATABASE_REPLICAS.
+    "core.middleware.DatabaseReplicaMiddleware",
     # "debug_toolbar.middleware.DebugToolbarMiddleware",  # delete this. RGenius
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -55,16 +64,31 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Работает только при QUERY_WATCH_ENABLED.
+    "core.middleware.QueryWatchMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates с замером времени рендеринга для метрик.
+        "BACKEND": "core.template_backends.TimedDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
+        "APP_DIRS": False,
         "OPTIONS": {
+            # Скомпилированные шаблоны хранятся в памяти. При DEBUG
+            # изменённый файл перечитывается, в продакшене - никогда.
+            "loaders": [
+                (
+                    "core.template_loaders.ReloadingLoader" if DEBUG
+                    else "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -77,6 +101,10 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать все шаблоны проекта при старте процесса: ошибка в шаблоне
+# не даст запуститься, а первый запрос не будет разбирать шаблоны.
+TEMPLATES_PRECOMPILE = not DEBUG
+
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 
@@ -87,9 +115,48 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Соединение живёт между запросами: прагмы ниже не выполняются
+        # заново на каждый запрос.
+        "CONN_MAX_AGE": 60,
+        "OPTIONS": {
+            # Секунд ждать блокировку записи до "database is locked".
+            "timeout": 20,
+        },
     }
 }
 
+# Реплики только для чтения (core.replicas): {алиас из DATABASES: вес}.
+# Чтение моделей из DATABASE_REPLICA_APPS распределяется между ними
+# пропорционально весам, запись идёт в default. Локально реплики - копии
+# db.sqlite3, которые обновляет команда sync_replicas, например:
+#
+#   DATABASES["replica1"] = {
+#       "ENGINE": "django.db.backends.sqlite3",
+#       "NAME": "file:{}?mode=ro".format(
+#           os.path.join(BASE_DIR, "replica1.sqlite3")
+#       ),
+#       "OPTIONS": {"uri": True},
+#   }
+#   DATABASE_REPLICAS = {"replica1": 2, "replica2": 1}
+DATABASE_REPLICAS = {}
+DATABASE_REPLICA_APPS = {"posts"}
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# Сколько секунд после записи пользователь читает только из default.
+DATABASE_STICKY_SECONDS = 10
+DATABASE_STICKY_COOKIE = "primary_until"
+# Сколько секунд не обращаться к реплике после ошибки подключения.
+DATABASE_REPLICA_RETRY_SECONDS = 30
+
+# Прагмы для каждого нового соединения с SQLite (core.db).
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 20000,
+    "cache_size": -64000,  # в КиБ, 64 МБ
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -131,6 +198,17 @@ STATIC_URL = "/static/"
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
+# Куда collectstatic собирает статику для продакшена.
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+# В продакшене имена статики содержат хэш содержимого, а рядом лежат
+# сжатые .gz/.br копии (core.storage); такие файлы кэшируются навсегда.
+if not DEBUG:
+    STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+
+# Время кэширования статики без хэша в имени, секунды.
+STATIC_MAX_AGE = 60 * 60
+
 
 # delete this. RGenius
 # INTERNAL_IPS = [
@@ -140,6 +218,60 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 # ]
 # delete this. RGenius
 
+# Токен для /internal/metrics/: Prometheus передаёт его в заголовке
+# "Authorization: Bearer <токен>" (bearer_token в scrape_config). Адрес
+# клиента не проверяется: за обратным прокси все запросы приходят
+# с 127.0.0.1. None - страница метрик отключена.
+METRICS_TOKEN = None
+
+# Поиск медленных запросов и N+1 (core.querywatch): пишет в лог
+# core.middleware запросы дольше QUERY_WATCH_SLOW_MS миллисекунд и
+# SELECT одной формы, повторённые за HTTP-запрос QUERY_WATCH_REPEAT раз.
+QUERY_WATCH_ENABLED = False
+QUERY_WATCH_SLOW_MS = 100
+QUERY_WATCH_REPEAT = 5
+
+# Лента index/group_posts/profile листается курсорами ?after=/?before=
+# вместо ?page=N: без COUNT(*) и OFFSET на больших таблицах.
+POSTS_CURSOR_PAGINATION = False
+
+# Комментариев на странице поста и в одной подгружаемой порции.
+POSTS_COMMENTS_PER_PAGE = 20
+
+# Посты авторов, у которых столько подписчиков или больше, не
+# раскладываются по лентам подписок при публикации, а подмешиваются при
+# чтении ленты (posts.timelines).
+POSTS_FANOUT_MAX_FOLLOWERS = 1000
+
+# Время жизни страниц лент в кэше для анонимных пользователей, секунды;
+# 0 отключает кэш. Устаревшие страницы сбрасываются сигналами моделей,
+# а TTL лишь ограничивает память.
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Кэш страниц и фрагментов шаблонов. Сигналы сбрасывают его в том
+# процессе, где сохранена модель, поэтому в продакшене с несколькими
+# процессами кэш должен быть общим: LocMemCache у каждого процесса свой,
+# и остальные процессы отдавали бы устаревшие страницы до истечения TTL
+# (проверка posts.E001 в `manage.py check --deploy`).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+if not DEBUG:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": "127.0.0.1:11211",
+    }
+
+# Бэкенд поиска постов (posts.search); None - FTS5 на SQLite,
+# поиск по LIKE на остальных СУБД.
+POSTS_SEARCH_BACKEND = None
+
+# Размер страницы JSON API по умолчанию и наибольший ?limit=.
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -163,3 +295,14 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры, которые создаются заранее при загрузке картинки поста.
+# Должны совпадать с тегами {% thumbnail %} в includes/post_card.html
+# и posts/post_detail.html.
+POSTS_THUMBNAILS = [
+    ("100x100", {"crop": "center"}),
+    ("960x339", {"crop": "center", "upscale": True}),
+]
+# Потоки фонового пула миниатюр; 0 - создавать сразу в запросе.
+POSTS_THUMBNAIL_WORKERS = 2
+POSTS_THUMBNAIL_RETRIES = 3
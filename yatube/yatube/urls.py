@@ -18,12 +18,16 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import prometheus_metrics
+
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("", include("posts.urls", namespace="posts")),
+    path("api/v1/", include("api.urls", namespace="api")),
     path("admin/", admin.site.urls),
     path("about/", include("about.urls", namespace="about")),
+    path("internal/metrics/", prometheus_metrics, name="metrics"),
     # path('__debug__/', include('debug_toolbar.urls')),  # delete this.RGenius
 ]
 handler404 = 'core.views.page_not_found'